@@ -1,11 +1,18 @@
-import json
 import configparser
-from typing import Optional, Type, Union
-
-from flask import Response, Flask
+import datetime
+import logging.config
+import os
+import sys
+from typing import Any, Optional, Type, Union
+
+import jinja2
+import orjson
+from flask import Response, Flask, g, get_flashed_messages, request, session
+from flask.templating import Environment
 from flask.typing import ResponseReturnValue
 from flask_apscheduler import APScheduler
 from flask_session import Session
+from pydantic.json import ENCODERS_BY_TYPE, pydantic_encoder
 
 from apps import apps
 from conf import settings
@@ -13,18 +20,37 @@ from responses.api import APIResponse
 from exception_handlers import logical_exception_handler
 
 
-def patch_pydantic_datetime_serializer():
-    """
-    pydantic.json.ENCODERS_BY_TYPE 没有提供自定义的机制，我们希望自定义 datetime 的序列化格式，
-    因此使用这种比较 dirty 的方式进行 hack。
-    """
-    import datetime
+# pydantic.json.ENCODERS_BY_TYPE 没有提供自定义的机制，我们希望自定义 datetime 的序列化格式，
+# 因此使用这种比较 dirty 的方式进行 hack。
+# 在模块导入时注册一次; 直接用 f-string 拼接, 避免 strftime 每次调用都重新解析格式串
+if getattr(ENCODERS_BY_TYPE.get(datetime.datetime), "__module__", None) != __name__:
+    ENCODERS_BY_TYPE[datetime.date] = lambda o: f"{o.year:04d}-{o.month:02d}-{o.day:02d}"
+    ENCODERS_BY_TYPE[datetime.time] = lambda o: f"{o.hour:02d}:{o.minute:02d}:{o.second:02d}"
+    ENCODERS_BY_TYPE[datetime.datetime] = lambda o: (
+        f"{o.year:04d}-{o.month:02d}-{o.day:02d} {o.hour:02d}:{o.minute:02d}:{o.second:02d}"
+    )
 
-    from pydantic.json import ENCODERS_BY_TYPE
 
-    ENCODERS_BY_TYPE[datetime.date] = lambda o: o.strftime("%Y-%m-%d")
-    ENCODERS_BY_TYPE[datetime.time] = lambda o: o.strftime("%H:%M:%S")
-    ENCODERS_BY_TYPE[datetime.datetime] = lambda o: o.strftime("%Y-%m-%d %H:%M:%S")
+# 与应用实例无关的 jinja 全局变量, url_for/config 在创建环境时单独设置
+_STATIC_JINJA_GLOBALS = {
+    "get_flashed_messages": get_flashed_messages,
+    "request": request,
+    "session": session,
+    "g": g,
+}
+
+# orjson 序列化选项: 日期时间交给 pydantic_encoder, 以保持上面自定义的序列化格式
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _jinja_json_dumps(obj: Any, **kwargs: Any) -> str:
+    """
+    jinja 的 |tojson 使用的 dumps 函数, jinja 默认会传入 sort_keys=True, 其他参数忽略
+    """
+    option = _ORJSON_OPTIONS
+    if kwargs.get("sort_keys"):
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=pydantic_encoder, option=option).decode()
 
 
 # cors
@@ -34,45 +60,115 @@ def after_request(resp: Response) -> Response:
 
 
 class CusFlask(Flask):
+    def create_jinja_environment(self) -> Environment:
+        """
+        与 Flask.create_jinja_environment 基本一致, 区别在于:
+
+        * 非 DEBUG 模式下总是关闭 auto_reload, 即使误配置了 TEMPLATES_AUTO_RELOAD,
+          也不会在每次渲染时 stat 模版文件
+        * cache_size 默认为 -1 (不限制), 模版编译一次后在整个进程生命周期内复用
+        * Flask 自身的 loader 只创建一次, 重复创建 jinja 环境时直接复用
+        * 模版编译后的字节码缓存在 instance_path/jinja_cache 目录中, 进程重启或
+          新 worker 启动时不需要重新编译模版
+        * |tojson 与 API 响应一样使用 orjson 序列化
+        """
+        options = dict(self.jinja_options)
+
+        if "loader" not in options:
+            options["loader"] = self._get_template_loader()
+
+        if "autoescape" not in options:
+            options["autoescape"] = self.select_jinja_autoescape
+
+        auto_reload = options.get("auto_reload", self.config["TEMPLATES_AUTO_RELOAD"])
+        if auto_reload is None:
+            auto_reload = self.debug
+        options["auto_reload"] = bool(auto_reload) and self.debug
+
+        options.setdefault("cache_size", -1)
+
+        if "bytecode_cache" not in options:
+            cache_dir = os.path.join(self.instance_path, "jinja_cache")
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError:
+                # 目录无法创建 (如只读文件系统) 时不使用字节码缓存
+                pass
+            else:
+                options["bytecode_cache"] = jinja2.FileSystemBytecodeCache(cache_dir)
+
+        rv = self.jinja_environment(self, **options)
+        rv.globals.update(_STATIC_JINJA_GLOBALS)
+        rv.globals["url_for"] = self.url_for
+        rv.globals["config"] = self.config
+        rv.policies["json.dumps_function"] = _jinja_json_dumps
+        return rv
+
+    def _get_template_loader(self) -> jinja2.BaseLoader:
+        """
+        Flask 自身的 loader, 缓存在应用实例上, 重复创建 jinja 环境时直接复用
+        """
+        loader = self.__dict__.get("_template_loader")
+        if loader is None:
+            loader = self.create_global_jinja_loader()
+            self._template_loader = loader
+        return loader
+
     def make_response(self, rv: Union[ResponseReturnValue, Type[APIResponse]]) -> Response:
-        if issubclass(type(rv), APIResponse):
+        if isinstance(rv, APIResponse):
             body, status_code = rv.content # type: ignore [union-attr]
-            return Response(json.dumps(body), status=status_code, content_type="application/json")
+            # orjson 直接输出 bytes; 日期时间交给 pydantic_encoder, 以保持自定义的序列化格式
+            payload = orjson.dumps(body, default=pydantic_encoder, option=_ORJSON_OPTIONS)
+            return self.response_class(payload, status=status_code, content_type="application/json")
         return super().make_response(rv)
 
 
 _app_instance: Optional[CusFlask] = None
+# 日志只配置一次: 重复执行 fileConfig 会重建所有 handler 并重新打开日志文件
+_log_configured: bool = False
 
 
-def get_application() -> CusFlask:
-    import logging.config
-    import os
-    import sys
-    from pathlib import Path
+def get_application(enable_scheduler: Optional[bool] = None, enable_session: Optional[bool] = None) -> CusFlask:
+    """
+    创建 (或返回已创建的) 应用实例。
+
+    enable_scheduler / enable_session 用于控制是否启用 APScheduler 和 flask_session, 为 None 时
+    使用 settings.ENABLE_SCHEDULER / settings.ENABLE_SESSION。测试等不需要它们的场景
+    可以传入 False, 避免启动后台线程和连接 session 存储。
+    """
+    global _app_instance, _log_configured
+    if _app_instance is not None:
+        return _app_instance
 
-    if isinstance(settings.LOG_CONFIG_FILE, str):
+    if not _log_configured and isinstance(settings.LOG_CONFIG_FILE, str):
         try:
             logging.config.fileConfig(settings.LOG_CONFIG_FILE)
         except FileNotFoundError:
+            # 日志目录不存在, 从配置文件中取出 LOG_DIR 创建目录后重试;
+            # 与 fileConfig 一样用 ConfigParser 解析, key 不区分大小写, 也支持插值
             cp = configparser.ConfigParser()
-            cp.read(settings.LOG_CONFIG_FILE)
-            log_dir = cp["DEFAULT"]["LOG_DIR"].strip("'")
-            if not (settings.BASE_DIR / log_dir).exists():
-                (settings.BASE_DIR / Path(log_dir)).mkdir()
+            cp.read(settings.LOG_CONFIG_FILE, encoding="utf-8")
+            log_dir = cp["DEFAULT"]["LOG_DIR"].strip("'\"")
+            (settings.BASE_DIR / log_dir).mkdir(parents=True, exist_ok=True)
             logging.config.fileConfig(settings.LOG_CONFIG_FILE)
-
-    global _app_instance
-    if _app_instance is not None:
-        return _app_instance
+        # 只有配置成功后才标记, 失败时下次调用会重新尝试
+        _log_configured = True
 
     sys.path.insert(0, os.getcwd())
-    patch_pydantic_datetime_serializer()
+
+    if enable_scheduler is None:
+        enable_scheduler = settings.ENABLE_SCHEDULER
+    if enable_session is None:
+        enable_session = settings.ENABLE_SESSION
 
     app = CusFlask(__name__)
-    scheduler = APScheduler()
-    scheduler.init_app(app)
-    scheduler.start()
-    Session(app)
+    app.config["USE_X_SENDFILE"] = settings.USE_X_SENDFILE
+    if enable_scheduler:
+        app_scheduler = APScheduler()
+        app_scheduler.init_app(app)
+        app_scheduler.start()
+    if enable_session:
+        Session(app)
 
     apps.populate(settings.INSTALLED_APPS, flaskapp=app, settings=settings)
 
@@ -80,6 +176,8 @@ def get_application() -> CusFlask:
         router = app_config.get_router()
         if router:
             app.register_blueprint(router)
+    # 所有路由都已注册, 启动时就编译好 url_map, 不再等到第一个请求匹配路由时才做
+    app.url_map.update()
 
     app.after_request(after_request)
     app.register_error_handler(400, logical_exception_handler)
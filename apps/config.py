@@ -1,3 +1,4 @@
+import functools
 import os
 from pathlib import Path
 from types import ModuleType
@@ -8,6 +9,42 @@ from flask import Blueprint, Flask
 from conf import Settings
 
 
+@functools.lru_cache(maxsize=None)
+def _path_from_module(module: ModuleType) -> Path:
+    """Attempt to determine app's filesystem path from its module."""
+    # 模块 import 后 __path__ 不会再变化, 因此结果按模块缓存
+    # This function is adapted from django/apps/config.py
+    # See #21874 for extended discussion of the behavior of this method in
+    # various cases.
+    # Convert paths to list because Python's _NamespacePath doesn't support
+    # indexing.
+    paths = list(getattr(module, "__path__", []))
+
+    if len(paths) != 1:
+        filename = getattr(module, "__file__", None)
+        if filename is not None:
+            paths = [os.path.dirname(filename)]
+        else:
+            # For unknown reasons, sometimes the list returned by __path__
+            # contains duplicates that must be removed (#25246).
+            paths = list(dict.fromkeys(paths))
+
+    if len(paths) > 1:
+        raise RuntimeError(
+            "The app module %r has multiple filesystem locations (%r); "
+            "you must configure this app with an AppConfig subclass "
+            "with a 'path' class attribute." % (module, paths)
+        )
+    elif not paths:
+        raise RuntimeError(
+            "The app module %r has no filesystem location, "
+            "you must configure this app with an AppConfig subclass "
+            "with a 'path' class attribute." % module
+        )
+
+    return Path(paths[0])
+
+
 class AppConfig:
     name: str
     module: ModuleType
@@ -29,6 +66,10 @@ class AppConfig:
         if not hasattr(self, "warn_missing_router"):
             self.warn_missing_router = True
 
+        # get_router() 的结果 (包括没有 router 的情况) 只计算一次
+        self._router: Optional[Blueprint] = None
+        self._router_loaded: bool = False
+
     def ready(self, flaskapp: Flask, settings: Settings) -> None:
         """
         各应用可以重载此方法，做一些额外的设置。
@@ -36,39 +77,15 @@ class AppConfig:
         return
 
     def _path_from_module(self, module):
-        """Attempt to determine app's filesystem path from its module."""
-        # This method is copied from django/apps/config.py
-        # See #21874 for extended discussion of the behavior of this method in
-        # various cases.
-        # Convert paths to list because Python's _NamespacePath doesn't support
-        # indexing.
-        paths = list(getattr(module, "__path__", []))
-
-        if len(paths) != 1:
-            filename = getattr(module, "__file__", None)
-            if filename is not None:
-                paths = [os.path.dirname(filename)]
-            else:
-                # For unknown reasons, sometimes the list returned by __path__
-                # contains duplicates that must be removed (#25246).
-                paths = list(set(paths))
-
-        if len(paths) > 1:
-            raise RuntimeError(
-                "The app module %r has multiple filesystem locations (%r); "
-                "you must configure this app with an AppConfig subclass "
-                "with a 'path' class attribute." % (module, paths)
-            )
-        elif not paths:
-            raise RuntimeError(
-                "The app module %r has no filesystem location, "
-                "you must configure this app with an AppConfig subclass "
-                "with a 'path' class attribute." % module
-            )
-
-        return Path(paths[0])
+        return _path_from_module(module)
 
     def get_router(self) -> Optional[Blueprint]:
+        if not self._router_loaded:
+            self._router = self._import_router()
+            self._router_loaded = True
+        return self._router
+
+    def _import_router(self) -> Optional[Blueprint]:
         from importlib import import_module
 
         try:
@@ -18,6 +18,7 @@ class Apps:
     flaskapp: Flask
 
     _lock: threading.RLock
+    _ready_event: threading.Event
     _loading: bool
 
     def __init__(self):
@@ -26,10 +27,12 @@ class Apps:
         self.Flask = None
 
         self._lock = threading.RLock()
+        # populate() 全部完成 (包括各应用的 ready()) 后置位, 之后的调用无需获取锁
+        self._ready_event = threading.Event()
         self._loading = False
 
     def populate(self, installed_apps: List[str], flaskapp: Flask, settings: Settings) -> None:
-        if self.ready:
+        if self._ready_event.is_set():
             return
 
         # populate() might be called by two threads in parallel on servers
@@ -52,12 +55,14 @@ class Apps:
                 self.app_configs[app_config.name] = app_config
 
             # 预加载所有 models
-            self._load_models(settings)
+            if settings.PRELOAD_MODELS:
+                self._load_models(settings)
 
         self.ready = True
         self.flaskapp = flaskapp
 
         self._ready(flaskapp=flaskapp, settings=settings)
+        self._ready_event.set()
 
     def _load_models(self, settings: Settings) -> None:
         from importlib import import_module
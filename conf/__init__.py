@@ -1,16 +1,25 @@
+import functools
 import os
 import yaml
+from collections import deque
 from functools import cached_property
 from pathlib import Path
 from typing import (
-    ClassVar, List, Optional, Dict,
-    Type, TypeVar, Mapping, Any, Union
+    Callable, ClassVar, Deque, List, Optional, Dict,
+    Tuple, Type, TypeVar, Mapping, Any, Union
 )
 
 from pydantic import BaseModel, Field, validator
+from pydantic.main import ModelMetaclass
 
 from .exceptions import ImproperlyConfigured
-from utils.functional import SimpleLazyObject
+from utils.functional import SimpleLazyObject, empty
+
+try:
+    # libyaml 提供的 C 实现比纯 Python 的 SafeLoader 快一个数量级
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader  # type: ignore[misc]
 
 
 def get_env_name() -> str:
@@ -24,20 +33,37 @@ def get_env_name() -> str:
 ENV_NAME: str = get_env_name()
 
 
-def _merge_dict(a: dict, b: dict, *others: dict):
+def _merge_into(dst: dict, src: Mapping) -> dict:
     """
-    merge dict a and b, return a new dict
+    将 src 深度合并到 dst 中 (原地修改 dst), 相同的 key 以 src 为准, 返回 dst。
+
+    使用显式的栈代替递归, 不会为每一层创建新的 dict; src 中嵌套的 dict 会被复制
+    到 dst 中, 因此合并后 dst 不会与 src 共享嵌套的 dict。
     """
-    dst = a.copy()
-    for k, v in b.items():
-        if k in dst and isinstance(dst[k], dict) and isinstance(b[k], Mapping):
-            dst[k] = _merge_dict(dst[k], b[k])
-        else:
-            dst[k] = b[k]
-    if others:
-        return _merge_dict(dst, *others)
-    else:
-        return dst
+    stack: Deque[Tuple[dict, Mapping]] = deque([(dst, src)])
+    while stack:
+        target, source = stack.pop()
+        for k, v in source.items():
+            # yaml 解析出的都是普通 dict, 先做 __class__ 比较, 避免每个 key 都走一次 Mapping 的 isinstance 检查
+            if v.__class__ is dict or isinstance(v, Mapping):
+                sub: Any = target.get(k)
+                if sub.__class__ is not dict:
+                    sub = target[k] = {}
+                stack.append((sub, v))
+            else:
+                target[k] = v
+    return dst
+
+
+@functools.lru_cache(maxsize=8)
+def _read_yaml(path_str: str, mtime: float) -> dict:
+    """
+    读取并解析 yaml 文件, 结果按 (路径, 修改时间) 缓存, 各 BaseConfig 子类共享同一份解析结果。
+
+    注意: 返回值会被缓存, 调用方不能修改它。
+    """
+    # 直接把 bytes 交给 loader, 由 libyaml 自行解码, 比文本模式的文件对象更快
+    return yaml.load(Path(path_str).read_bytes(), Loader=SafeLoader) or {}
 
 
 def env_values(*, default: Any, **kwargs: Any) -> Any:
@@ -55,12 +81,39 @@ def env_values(*, default: Any, **kwargs: Any) -> Any:
     * 请总是提供 default 值, 如果没有合理的 default 值, 可在调用时传入 None 或 ..., 
       并在 validator 中处理该值。
     """
-    if ENV_NAME in kwargs:
-        return kwargs[ENV_NAME]
-    return default
+    return kwargs.get(ENV_NAME, default)
 
 
-class BaseConfig(BaseModel):
+def make_env_selector(*, default: Any, **kwargs: Any) -> Callable[[], Any]:
+    """
+    与 env_values 相同, 但返回一个无参函数, 可用作 Field 的 default_factory。用法举例: 
+
+    class FooSettings(BaseConfig):
+        bar: list = Field(default_factory=make_env_selector(dev=["a"], default=[]))
+
+    ENV_NAME 在 import 时就已确定, 取值在创建时计算一次, 之后调用直接返回该值。
+    """
+    value = kwargs.get(ENV_NAME, default)
+    return lambda: value
+
+
+class _ConfigMetaclass(ModelMetaclass):
+    """
+    每个 BaseConfig 子类只校验一次配置数据, 之后的实例化直接返回缓存的实例。
+
+    缓存放在 metaclass 的 __call__ 中而不是 __new__ 中: pydantic 的 copy()/construct()
+    会直接调用 cls.__new__, 如果在 __new__ 中返回缓存实例, 这些方法会改写它。
+    """
+
+    def __call__(cls, *args, **kwargs):
+        instance = cls.__dict__.get("_cached_instance")
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            cls._cached_instance = instance
+        return instance
+
+
+class BaseConfig(BaseModel, metaclass=_ConfigMetaclass):
     """
     各应用可以各自定义 config 模块, 所有 config 模块都继承此类。
 
@@ -82,6 +135,17 @@ class BaseConfig(BaseModel):
 
     _config_data: ClassVar[Dict] = None  # type: ignore[assignment]
 
+    # 已校验的实例, 按子类分别缓存, 见 _ConfigMetaclass
+    _cached_instance: ClassVar[Optional["BaseConfig"]] = None
+
+    class Config:
+        # 配置文件中多余的键直接忽略
+        extra = "ignore"
+        # 配置实例在进程内共享, 初始化之后不允许修改
+        allow_mutation = False
+        # 作为其他模型的字段时不再复制
+        copy_on_model_validation = "none"
+
     def __init__(self):
         if not self.__class__.config_namespace:
             raise ImproperlyConfigured(f"{self.__class__.__name__}.config_namespace not set.")
@@ -97,7 +161,12 @@ class BaseConfig(BaseModel):
     def _load_config_data(cls):
         project_config_data = cls._load_config_file(Path.cwd() / "main.config.yaml")
         local_config_data = cls._load_config_file(Path.cwd() / "config.yaml")
-        cls._config_data = _merge_dict({}, project_config_data, local_config_data)
+        merged: dict = {}
+        _merge_into(merged, project_config_data)
+        _merge_into(merged, local_config_data)
+        cls._config_data = merged
+        # 配置数据重新加载后, 之前缓存的实例随之失效
+        cls._cached_instance = None
 
     @classmethod
     def _load_config_file(cls, file: Path) -> dict:
@@ -106,25 +175,62 @@ class BaseConfig(BaseModel):
             return {}
 
         try:
-            with file.open(encoding="utf-8") as fp:
-                data = yaml.safe_load(fp)
+            data = _read_yaml(str(file), file.stat().st_mtime)
         except Exception:
             print(f"加载配置文件失败: {file}")
             raise
 
-        env_keys = [key for key in data.keys() if key.startswith("ENV_")]
-        env_overrides = {key[4:]: data.pop(key) for key in env_keys}
+        # data 是缓存的解析结果, 这里不能修改它, 合并时 _merge_into 会复制嵌套的 dict。
+        # 只遍历一次, 同时拆分出环境配置和普通配置
+        env_overrides: dict = {}
+        base_data: dict = {}
+        for key, value in data.items():
+            if key.startswith("ENV_"):
+                env_overrides[key[4:]] = value
+            else:
+                base_data[key] = value
         env_data = env_overrides.get(ENV_NAME, {})
 
-        data = _merge_dict(data, env_data)
-        return data
+        return _merge_into(_merge_into({}, base_data), env_data)
 
 
 ConfigType = TypeVar("ConfigType", bound=BaseConfig)
 
 
+class _LazyConfig(SimpleLazyObject):
+    """
+    与 SimpleLazyObject 相同, 但会把读取过的属性缓存到代理对象自身的 __dict__ 中
+    (参考 django.conf.LazySettings)。
+
+    之后再访问同一属性时由普通的属性查找直接命中, 不再经过 __getattr__ 转发。
+    """
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            self._setup()
+        val = getattr(self._wrapped, name)
+        self.__dict__[name] = val
+        return val
+
+    def __setattr__(self, name, value):
+        # 修改属性时清除缓存, 下次读取时重新从被代理对象获取;
+        # 替换被代理对象时, 除 _setupfunc 外的缓存全部失效
+        if name == "_wrapped":
+            setupfunc = self.__dict__.get("_setupfunc")
+            self.__dict__.clear()
+            if setupfunc is not None:
+                self.__dict__["_setupfunc"] = setupfunc
+        elif name != "_setupfunc":
+            self.__dict__.pop(name, None)
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        super().__delattr__(name)
+        self.__dict__.pop(name, None)
+
+
 def lazy_init(ConfigClass: Type[ConfigType]) -> ConfigType:
-    return SimpleLazyObject(lambda: ConfigClass())  # type: ignore[return-value,operator]
+    return _LazyConfig(lambda: ConfigClass())  # type: ignore[return-value,operator]
 
 
 class LocalFsUploadAdapterConfig(BaseModel):
@@ -234,6 +340,26 @@ class Settings(BaseConfig):
     # 安装的应用, 格式为:  "{module}.{AppConfigClass}"
     INSTALLED_APPS: List[str] = Field(default_factory=list)
 
+    # 是否启动 APScheduler, 测试环境中默认关闭
+    ENABLE_SCHEDULER: bool = Field(
+        default_factory=lambda: env_values(
+            testing=False,
+            default=True,
+        )
+    )
+
+    # 是否启用 flask_session, 测试环境中默认关闭
+    ENABLE_SESSION: bool = Field(
+        default_factory=lambda: env_values(
+            testing=False,
+            default=True,
+        )
+    )
+
+    # 是否在 apps.populate() 时预加载所有应用的 models 模块, 所有环境下默认开启。
+    # relationship("Other") 等字符串形式的引用要求对端 model 已被 import, 关闭前需确认各 model 自行 import 了依赖
+    PRELOAD_MODELS: bool = Field(True)
+
     # 数据库配置
     DATABASE: str = Field(None)
 
@@ -261,9 +387,16 @@ class Settings(BaseConfig):
             v = v.replace("postgres://", "postgresql://")
         return v
 
+    # SQLAlchemy 编译 SQL 的缓存大小 (每个 engine), SQLAlchemy 默认为 500
+    DB_QUERY_CACHE_SIZE: int = 1200
+
     # 静态文件访问地址
     STATIC_URL: Optional[str] = None
 
+    # 静态文件由前端的 nginx 等服务器直接发送 (X-Sendfile), 需要服务器做相应配置。
+    # 关闭时 Flask 通过 wsgi.file_wrapper 返回文件, gunicorn 等服务器会使用 sendfile(2)
+    USE_X_SENDFILE: bool = False
+
     # 上传文件配置
     # TODO 应推广使用 oss, 尽快废弃 LocalFsUploadAdapter
     UPLOAD: LocalFsUploadAdapterConfig = Field(default_factory=LocalFsUploadAdapterConfig)
@@ -111,16 +111,17 @@ class Client(BaseModel):
     name: str = Field(title="客户端名称")
     version: Optional[str] = Field(None, title="客户端版本")
 
+    class Config:
+        # 作为其他模型的字段时不再复制, 每个请求都会解析一次, 省去这一步
+        copy_on_model_validation = "none"
+
     @classmethod
     def parse_header(cls, header: Optional[str]) -> Optional["Client"]:
         if not header:
             return None
 
-        if "/" not in header:
-            return cls(name=header, version=None)
-
-        name, version = header.split("/", 1)
-        return cls(name=name, version=version)
+        name, sep, version = header.partition("/")
+        return cls(name=name, version=version if sep else None)
 
 
 class Token(BaseModel):
@@ -139,6 +140,9 @@ class Token(BaseModel):
 
     token: str = Field(title="唯一标识，可用于给用户")
 
+    class Config:
+        copy_on_model_validation = "none"
+
     def is_expired(self):
         return self.expires < time.time()
 
@@ -8,6 +8,10 @@ _engines_cache = {
     "default": None
 }
 
+# 按 dsn 缓存 engine, 同一个 dsn 只创建一个 engine (连接池), 不同的 key 指向同一个
+# 数据库时也共用它
+_engines_by_dsn: Dict[str, Engine] = {}
+
 def _create_engine(dsn):
     if dsn.startswith("sqlite"):
         execution_options: dict = {
@@ -23,25 +27,42 @@ def _create_engine(dsn):
         echo=settings.DEBUG_DB,
         pool_pre_ping=True,
         execution_options=execution_options,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
         future=True,
     )
 
+    # 第三方 dialect 没有声明 supports_statement_cache 时, SQLAlchemy 会静默关闭 SQL 编译缓存,
+    # 每条查询都要重新编译, 这里给出提示
+    if not getattr(engine.dialect, "supports_statement_cache", False):
+        print(f"[警告] 数据库 dialect {engine.dialect.name} 不支持 SQL 编译缓存, 查询性能会受到影响")
+
+    return engine
+
+def _get_engine(dsn: str) -> Engine:
+    engine = _engines_by_dsn.get(dsn)
+    if engine is None:
+        engine = _engines_by_dsn[dsn] = _create_engine(dsn)
     return engine
 
 def init_engine():
+    from .session import _sessionmaker_cache
+
     # 这里在载入数据库配置文件的时候就排除了None的可能性
     # 所以这里传入的值为设置的dsn或者sqlite://（内存）
     dsn: Union[str, Dict[str, str]] = settings.DATABASE
 
     if isinstance(dsn, str):
-        _engines_cache["default"] = _create_engine(dsn)
+        _engines_cache["default"] = _get_engine(dsn)
     
     if isinstance(dsn, dict):
         if "default" not in dsn.keys():
             raise ImproperlyConfigured("default not in DATABASES")
 
         for key, val in dsn.items():
-            _engines_cache[key] = _create_engine(val)
+            _engines_cache[key] = _get_engine(val)
+
+    # 已缓存的 sessionmaker 绑定的是旧的 engine, 重新初始化后需要重新创建
+    _sessionmaker_cache.clear()
 
 init_engine()
 
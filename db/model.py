@@ -2,22 +2,24 @@
 参考 sqlalchemy-mixins 的实现方法，实现一套类似 Django 的 Manager 类。
 """
 
-from typing import Any, ClassVar, Dict, List, Optional, Type, Union
+import functools
+import uuid
+from typing import Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type, Union
 
-from sqlalchemy import asc, desc, inspect
+from sqlalchemy import asc, desc, event, insert, inspect
 from sqlalchemy.ext.declarative import DeclarativeMeta, declarative_base
 from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
-from sqlalchemy.orm import ColumnProperty, Query, RelationshipProperty
+from sqlalchemy.orm import ColumnProperty, Mapper, Query, RelationshipProperty
 from sqlalchemy.orm.attributes import QueryableAttribute
 from sqlalchemy.orm.util import AliasedClass
 from sqlalchemy.sql import extract, operators
 
-from utils.functional import classproperty
+from utils.functional import cached_classproperty
 
 from . import operators as flaskapp_operators
 from .exceptions import ObjectDoesNotExist
 from .session import DB
-from .smartquery import DESC_PREFIX, OPERATOR_SPLITTER, ModelType, SmartQuery
+from .smartquery import DESC_PREFIX, OPERATOR_SPLITTER, JoinMethodType, ModelType, SmartQuery
 
 
 class FlaskAppDeclarativeMeta(DeclarativeMeta):
@@ -30,6 +32,9 @@ class FlaskAppDeclarativeMeta(DeclarativeMeta):
 
 BaseModel = declarative_base(metaclass=FlaskAppDeclarativeMeta)
 
+# Model.get() 可以直接交给 session.get() 的主键值类型
+_SCALAR_PK_TYPES = (int, str, bytes, uuid.UUID)
+
 
 class ReprMixin(BaseModel):
     # 代码摘自 sqlalchemy-mixins
@@ -81,11 +86,11 @@ class ReprMixin(BaseModel):
 class InspectionMixin(BaseModel):
     __abstract__ = True
 
-    @classproperty
+    @cached_classproperty
     def _columns(cls) -> List[str]:
         return inspect(cls).columns.keys()
 
-    @classproperty
+    @cached_classproperty
     def _primary_keys_full(cls) -> List[ColumnProperty]:
         """Get primary key properties for a SQLAlchemy cls.
         Taken from marshmallow_sqlalchemy
@@ -93,37 +98,42 @@ class InspectionMixin(BaseModel):
         mapper = cls.__mapper__  # type: ignore[attr-defined]
         return [mapper.get_property_by_column(column) for column in mapper.primary_key]
 
-    @classproperty
+    @cached_classproperty
     def _primary_keys(cls) -> List[str]:
         return [pk.key for pk in cls._primary_keys_full]
 
-    @classproperty
+    @cached_classproperty
+    def _primary_key_set(cls) -> FrozenSet[str]:
+        return frozenset(cls._primary_keys)
+
+    @cached_classproperty
     def _relations(cls):  # TODO add type annotation
         """Return a `list` of relationship names or the given model"""
         return [c.key for c in cls.__mapper__.iterate_properties if isinstance(c, RelationshipProperty)]
 
-    @classproperty
+    @cached_classproperty
     def _settable_relations(cls):  # TODO add type annotation
         """Return a `list` of relationship names or the given model"""
         return [r for r in cls._relations if getattr(cls, r).property.viewonly is False]
 
-    @classproperty
+    @cached_classproperty
     def _hybrid_properties(cls) -> List[str]:
         items = inspect(cls).all_orm_descriptors
         return [item.__name__ for item in items if isinstance(item, hybrid_property)]  # type: ignore[attr-defined]
 
-    @classproperty
+    @cached_classproperty
     def _hybrid_methods_full(cls):  # TODO add type annotation
         items = inspect(cls).all_orm_descriptors
         return {item.func.__name__: item for item in items if type(item) == hybrid_method}
 
-    @classproperty
-    def _hybrid_methods(cls) -> List[str]:
-        return list(cls._hybrid_methods_full.keys())
+    # 以下几个属性只用于判断成员关系, 使用 frozenset, 迭代请使用 _columns 等 list 版本
+    @cached_classproperty
+    def _hybrid_methods(cls) -> FrozenSet[str]:
+        return frozenset(cls._hybrid_methods_full)
 
-    @classproperty
-    def settable_attributes(cls):
-        return cls._columns + cls._hybrid_properties + cls._settable_relations
+    @cached_classproperty
+    def settable_attributes(cls) -> FrozenSet[str]:
+        return frozenset(cls._columns + cls._hybrid_properties + cls._settable_relations)
 
 
 class SmartQueryMixin(InspectionMixin):
@@ -172,13 +182,13 @@ class SmartQueryMixin(InspectionMixin):
         # "datetime_range": flaskapp_operators.datetime_range,
     }
 
-    @classproperty
-    def _filterable_attributes(cls):
-        return cls._relations + cls._columns + cls._hybrid_properties + cls._hybrid_methods
+    @cached_classproperty
+    def _filterable_attributes(cls) -> FrozenSet[str]:
+        return frozenset(cls._relations + cls._columns + cls._hybrid_properties).union(cls._hybrid_methods)
 
-    @classproperty
-    def _sortable_attributes(cls):
-        return cls._columns + cls._hybrid_properties
+    @cached_classproperty
+    def _sortable_attributes(cls) -> FrozenSet[str]:
+        return frozenset(cls._columns + cls._hybrid_properties)
 
     @classmethod
     def _filter_expr(cls_or_alias, **filters):
@@ -237,33 +247,14 @@ class SmartQueryMixin(InspectionMixin):
         else:
             mapper = cls = cls_or_alias
 
-        expressions = []
-        valid_attributes = cls._filterable_attributes
-        for attr, value in filters.items():
-            # if attribute is filtered by method, call this method
-            if attr in cls._hybrid_methods:
-                method = getattr(cls, attr)
-                expressions.append(method(value, mapper=mapper))
-            # else just add simple condition (== for scalars or IN for lists)
-            else:
-                # determine attribute name and operator
-                # if they are explicitly set (say, id___between), take them
-                if OPERATOR_SPLITTER in attr:
-                    attr_name, op_name = attr.rsplit(OPERATOR_SPLITTER, 1)
-                    if op_name not in cls._operators:
-                        raise KeyError("Expression `{}` has incorrect " "operator `{}`".format(attr, op_name))
-                    op = cls._operators[op_name]
-                # assume equality operator for other cases (say, id=1)
-                else:
-                    attr_name, op = attr, operators.eq
-
-                if attr_name not in valid_attributes:
-                    raise KeyError("Expression `{}` " "has incorrect attribute `{}`".format(attr, attr_name))
-
-                column = getattr(mapper, attr_name)
-                expressions.append(op(column, value))
-
-        return expressions
+        # if attribute is filtered by method, call this method,
+        # else just add simple condition (== for scalars or IN for lists)
+        return [
+            getattr(cls, attr_name)(filters[key], mapper=mapper)
+            if is_hybrid_method
+            else op(getattr(mapper, attr_name), filters[key])
+            for key, attr_name, op, is_hybrid_method in _compile_filter_plan(cls, tuple(filters))
+        ]
 
     @classmethod
     def _order_expr(cls_or_alias, *columns):
@@ -298,6 +289,63 @@ class SmartQueryMixin(InspectionMixin):
         return expressions
 
 
+@functools.lru_cache(maxsize=4096)
+def _parse_filter_key(cls: Type["SmartQueryMixin"], attr: str) -> Tuple[str, Optional[Callable], bool]:
+    """
+    解析 filter 的 key (如 "id", "name__like"), 返回 (属性名, 操作符, 是否为 hybrid method)。
+
+    同一个 model 的 filter key 通常是有限的几种, 解析结果按 (cls, key) 缓存;
+    key 不合法时抛出 KeyError, 不会被缓存。
+    """
+    # if attribute is filtered by method, call this method
+    if attr in cls._hybrid_methods:
+        return attr, None, True
+
+    # determine attribute name and operator
+    # if they are explicitly set (say, id___between), take them
+    if OPERATOR_SPLITTER in attr:
+        attr_name, op_name = attr.rsplit(OPERATOR_SPLITTER, 1)
+        if op_name not in cls._operators:
+            raise KeyError("Expression `{}` has incorrect " "operator `{}`".format(attr, op_name))
+        op = cls._operators[op_name]
+    # assume equality operator for other cases (say, id=1)
+    else:
+        attr_name, op = attr, operators.eq
+
+    if attr_name not in cls._filterable_attributes:
+        raise KeyError("Expression `{}` " "has incorrect attribute `{}`".format(attr, attr_name))
+
+    return attr_name, op, False
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_filter_plan(cls: type, keys: Tuple[str, ...]) -> Tuple[Tuple[str, str, Optional[Callable], bool], ...]:
+    """
+    将一组 filter key 编译为执行计划, 每一项为 (key, 属性名, 操作符, 是否为 hybrid method)。
+    cls 为 SmartQueryMixin 的子类, 标注为 type 是因为 mypy 不认为 Type[SmartQueryMixin]
+    满足 lru_cache 要求的 Hashable。
+
+    接口中同一组 filter 参数往往会反复出现, 计划按 (cls, keys) 缓存, keys 保持调用时的顺序,
+    以保证生成的表达式顺序不变。
+    """
+    return tuple((key, *_parse_filter_key(cls, key)) for key in keys)
+
+
+@event.listens_for(Mapper, "after_configured")
+def _clear_inspection_cache() -> None:
+    """
+    InspectionMixin/SmartQueryMixin 上的 classproperty 以及 filter key 的解析结果按类缓存。
+    有新的 mapper 完成配置时 (如后 import 的 model 通过 backref 给已有的 model 添加了关系),
+    清空这些缓存。
+    """
+    for klass in (InspectionMixin, SmartQueryMixin):
+        for attr in vars(klass).values():
+            if isinstance(attr, cached_classproperty):
+                attr.clear()
+    _parse_filter_key.cache_clear()
+    _compile_filter_plan.cache_clear()
+
+
 class Model(ReprMixin, SmartQueryMixin, InspectionMixin, BaseModel):
     """
     Model 基类
@@ -311,7 +359,8 @@ class Model(ReprMixin, SmartQueryMixin, InspectionMixin, BaseModel):
 
     ### `save()`, `delete()`
 
-    提供两个便捷函数，在操作单个 model 时可以快速保存或删除。
+    提供两个便捷函数，在操作单个 model 时可以快速保存或删除。默认会立即 commit，
+    传入 `commit=False` 时只 flush，由调用方统一 commit。批量创建可使用 `bulk_create()`。
 
     ### `query()`
 
@@ -393,6 +442,17 @@ class Model(ReprMixin, SmartQueryMixin, InspectionMixin, BaseModel):
 
     @classmethod
     def get(cls: Type[ModelType], **filters: Dict[Any, Any]) -> ModelType:
+        # 只按主键查询时使用 session.get(), 对象已在 identity map 中时不会执行 SQL
+        pk_names = cls._primary_keys
+        if filters and len(filters) == len(pk_names) and filters.keys() == cls._primary_key_set:
+            pk = tuple(filters[name] for name in pk_names)
+            # 只有每个主键值都是标量时才走 session.get(); list/tuple 等会被当作复合主键,
+            # 与 filter 生成的等值比较语义不同, 这些情况仍由下面的 filter 处理
+            if all(isinstance(value, _SCALAR_PK_TYPES) for value in pk):
+                obj = cls._db.session.get(cls, pk if len(pk) > 1 else pk[0])
+                if obj is None:
+                    raise cls.DoesNotExist()
+                return obj
         return cls.query().get(**filters)
 
     @classmethod
@@ -404,15 +464,17 @@ class Model(ReprMixin, SmartQueryMixin, InspectionMixin, BaseModel):
         return cls.query().count()
 
     @classmethod
-    def select_related(cls: Type[ModelType], *fields: Union[str, QueryableAttribute]) -> SmartQuery[ModelType]:
-        return cls.query().select_related(*fields)
+    def select_related(
+        cls: Type[ModelType], *fields: Union[str, QueryableAttribute], strategy: Optional[JoinMethodType] = None
+    ) -> SmartQuery[ModelType]:
+        return cls.query().select_related(*fields, strategy=strategy)
 
     def _fill(self: ModelType, **kwargs: Dict[Any, Any]) -> ModelType:
-        for name in kwargs.keys():
-            if name in self.settable_attributes:
-                setattr(self, name, kwargs[name])
-            else:
+        settable_attributes = type(self).settable_attributes
+        for name, value in kwargs.items():
+            if name not in settable_attributes:
                 raise KeyError("Attribute '{}' doesn't exist".format(name))
+            setattr(self, name, value)
         return self
 
     @classmethod
@@ -424,10 +486,51 @@ class Model(ReprMixin, SmartQueryMixin, InspectionMixin, BaseModel):
     def update(self, **kwargs: Dict[Any, Any]) -> None:
         self._fill(**kwargs).save()
 
-    def save(self):
-        self._db.session.add(self)
-        self._db.session.commit()
+    @classmethod
+    def bulk_create(cls: Type[ModelType], items: Iterable[Dict[str, Any]], commit: bool = True) -> List[ModelType]:
+        """
+        批量创建对象, 所有对象在同一个事务中写入, 只 commit 一次。
+        """
+        objs = [cls()._fill(**item) for item in items]
+        session = cls._db.session
+        session.add_all(objs)
+        if commit:
+            session.commit()
+        else:
+            session.flush()
+        return objs
 
-    def delete(self):
-        self._db.session.delete(self)
-        self._db.session.commit()
+    @classmethod
+    def bulk_insert(cls, items: List[Dict[str, Any]], commit: bool = True) -> None:
+        """
+        使用一条 INSERT (executemany) 批量写入数据, 不经过 ORM 的 unit of work。
+
+        注意: 不会创建/返回 model 对象, 也不会触发 ORM 事件, 字段的默认值只有 Column 上
+        定义的 default 会生效。适用于只需要写入数据的导入类场景。
+        """
+        if not items:
+            return
+        session = cls._db.session
+        session.execute(insert(cls), items)
+        if commit:
+            session.commit()
+
+    def save(self, commit: bool = True):
+        """
+        commit=False 时只 flush, 由调用方 (或 DB 退出时) 统一 commit,
+        在循环中保存多个对象时可以避免每次都开启/提交一次事务。
+        """
+        session = self._db.session
+        session.add(self)
+        if commit:
+            session.commit()
+        else:
+            session.flush()
+
+    def delete(self, commit: bool = True):
+        session = self._db.session
+        session.delete(self)
+        if commit:
+            session.commit()
+        else:
+            session.flush()
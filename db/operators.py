@@ -8,13 +8,14 @@ from utils import timezone
 
 
 def region_in(column: Column, code: str) -> Union[str, bool]:
-    if code[2:] == "0000":
-        return column.startswith(code[:2])
-
-    elif code[4:] == "00":
-        return column.startswith(code[:4])
-    else:
-        return column == code
+    # 行政区划代码为 6 位: 省级以 "0000" 结尾, 市级以 "00" 结尾, 其他按区县精确匹配。
+    # 用 endswith 判断, 不需要切片出临时字符串
+    if len(code) == 6:
+        if code.endswith("0000"):
+            return column.startswith(code[:2])
+        if code.endswith("00"):
+            return column.startswith(code[:4])
+    return column == code
 
 
 def is_today(column: Column, value: bool) -> bool:
@@ -2,7 +2,7 @@ import functools
 import inspect
 from contextvars import ContextVar, Token
 from dataclasses import dataclass
-from typing import Optional, Dict
+from typing import Dict, FrozenSet, Optional
 
 from sqlalchemy.orm import Session, sessionmaker
 
@@ -38,19 +38,21 @@ class FlaskAppSession(Session):
         if self.in_nested_transaction():
             print("WARNING: 在 nested session 中调用 rollback() 将不执行任何操作。")
             return
-        return super().commit()
+        return super().rollback()
 
 
-def _create_sessionmaker(params: Optional[Dict[str, str]] = None) -> sessionmaker:
-    """
-    params: like, {"pg1": "postgresql+psycopg2://....."}
-    """
-    from .engine import _engines_cache, _create_engine
+# sessionmaker 按 custom_session_params 缓存, 相同的配置在整个进程内只创建一次
+_sessionmaker_cache: Dict[FrozenSet, sessionmaker] = {}
+
+
+def _build_sessionmaker(params: Optional[Dict[str, str]] = None) -> sessionmaker:
+    from .engine import _engines_cache, _get_engine
     bind_engine = _engines_cache["default"]
 
     if params is not None:
         for key, val in params.items():
-            _engines_cache[key] = _create_engine(val)
+            # 已经创建过的 dsn 直接复用其 engine, 不会重复创建连接池
+            _engines_cache[key] = _get_engine(val)
             bind_engine = _engines_cache[key]
 
     return sessionmaker(
@@ -60,6 +62,17 @@ def _create_sessionmaker(params: Optional[Dict[str, str]] = None) -> sessionmake
     )
 
 
+def _create_sessionmaker(params: Optional[Dict[str, str]] = None) -> sessionmaker:
+    """
+    params: like, {"pg1": "postgresql+psycopg2://....."}
+    """
+    key = frozenset((params or {}).items())
+    maker = _sessionmaker_cache.get(key)
+    if maker is None:
+        maker = _sessionmaker_cache.setdefault(key, _build_sessionmaker(params))
+    return maker
+
+
 @dataclass
 class _DBStateInContext:
     session_args: dict
@@ -77,13 +90,16 @@ class DBMeta(type):
         if dbstate is None:
             raise RuntimeError("dbstate 未初始化。请在 `with DB():` 代码块中使用数据库。")
 
-        if dbstate.session is None:
-            if dbstate.custom_session_params != {}:
-                dbstate.session = _create_sessionmaker(dbstate.custom_session_params)(**dbstate.session_args)
-            else:
-                dbstate.session = _create_sessionmaker()(**dbstate.session_args)
+        session = dbstate.session
+        if session is not None:
+            return session
 
-        return dbstate.session
+        if dbstate.custom_session_params != {}:
+            session = _create_sessionmaker(dbstate.custom_session_params)(**dbstate.session_args)
+        else:
+            session = _create_sessionmaker()(**dbstate.session_args)
+        dbstate.session = session
+        return session
 
 
 class DB(metaclass=DBMeta):
@@ -1,4 +1,4 @@
-from collections import OrderedDict
+import functools
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -15,8 +15,8 @@ from typing import (
     Union,
 )
 
-from sqlalchemy.orm import Query, aliased, contains_eager, joinedload, subqueryload
-from sqlalchemy.orm.attributes import InstrumentedAttribute, QueryableAttribute
+from sqlalchemy.orm import Query, aliased, contains_eager, joinedload, selectinload, subqueryload
+from sqlalchemy.orm.attributes import QueryableAttribute
 from sqlalchemy.orm.exc import MultipleResultsFound
 
 from .exceptions import MultipleObjectsReturned
@@ -27,7 +27,7 @@ if TYPE_CHECKING:
 ModelType = TypeVar("ModelType", bound="Model")
 SmartQueryType = TypeVar("SmartQueryType", bound="SmartQuery")
 
-JoinMethodType = Literal["joined", "subquery"]
+JoinMethodType = Literal["joined", "subquery", "selectin"]
 EagerSchemaType = Dict[  # type: ignore[misc]
     Union[str, QueryableAttribute],
     Union[Tuple[JoinMethodType, "EagerSchemaType"], "EagerSchemaType", JoinMethodType],  # type: ignore[misc]
@@ -40,8 +40,9 @@ CustomQueryBuilder = Callable[[Query], Query]
 RELATION_SPLITTER = "___"
 OPERATOR_SPLITTER = "__"
 DESC_PREFIX = "-"
-JOINED = "joined"
-SUBQUERY = "subquery"
+JOINED: JoinMethodType = "joined"
+SUBQUERY: JoinMethodType = "subquery"
+SELECTIN: JoinMethodType = "selectin"
 
 
 class SmartQuery(Generic[ModelType]):
@@ -50,15 +51,13 @@ class SmartQuery(Generic[ModelType]):
     的 smartquery。
     """
 
+    # 链式调用时每一步都会创建新的 SmartQuery, 使用 __slots__ 省去实例的 __dict__
+    __slots__ = ("model", "query")
+
     def __init__(self, model: Type[ModelType], query: Optional[Query] = None):
         self.model: Type[ModelType] = model
-        self._query: Optional[Query] = query
-
-    @property
-    def query(self) -> Query:
-        if self._query is None:
-            self._query = self.model._db.session.query(self.model)
-        return self._query
+        # 几乎所有方法都会用到 query, 在创建时直接构造, 之后只是普通的属性访问
+        self.query: Query = query if query is not None else model._db.session.query(model)
 
     def filter(self: SmartQueryType, **filters: Dict[Any, Any]) -> SmartQueryType:
         return self.__class__(self.model, smart_query(self.query, filters=filters))
@@ -68,22 +67,20 @@ class SmartQuery(Generic[ModelType]):
 
     def all(self, **filters: Dict[Any, Any]) -> List[ModelType]:
         if filters:
-            return self.filter(**filters).all()
+            return smart_query(self.query, filters=filters).all()
 
         return self.query.all()
 
     def first(self, **filters: Dict[Any, Any]) -> Optional[ModelType]:
         if filters:
-            return self.filter(**filters).first()
+            return smart_query(self.query, filters=filters).first()
 
         return self.query.first()
 
     def get(self, **filters: Dict[Any, Any]) -> ModelType:
-        if filters:
-            return self.filter(**filters).get()
-
+        query = smart_query(self.query, filters=filters) if filters else self.query
         try:
-            obj = self.query.one_or_none()
+            obj = query.one_or_none()
         except MultipleResultsFound:
             raise MultipleObjectsReturned()
         if not obj:
@@ -92,7 +89,7 @@ class SmartQuery(Generic[ModelType]):
 
     def one_or_none(self, **filters: Dict[Any, Any]) -> Optional[ModelType]:
         if filters:
-            return self.filter(**filters).one_or_none()
+            return smart_query(self.query, filters=filters).one_or_none()
         return self.query.one_or_none()
 
     def delete(self):
@@ -101,15 +98,37 @@ class SmartQuery(Generic[ModelType]):
     def count(self) -> int:
         return self.query.count()
 
-    def select_related(self: SmartQueryType, *fields: Union[str, QueryableAttribute]) -> SmartQueryType:
+    def select_related(
+        self: SmartQueryType,
+        *fields: Union[str, QueryableAttribute],
+        strategy: Optional[JoinMethodType] = None,
+    ) -> SmartQueryType:
+        """
+        预加载关联对象。strategy 为 None 时按关系类型选择加载方式:
+
+        * 多对一/一对一 (uselist=False): joined, 通过 JOIN 一次查出
+        * 一对多/多对多 (uselist=True): selectin, 额外执行一条 IN 查询, 避免 JOIN 导致
+          主表的行被重复返回
+
+        也可以通过 strategy 指定所有字段统一使用 "joined" / "subquery" / "selectin"。
+        """
         return self.__class__(
             self.model,
             smart_query(
                 self.query,
-                schema={v: JOINED for v in fields},
+                schema={v: strategy or self._default_load_strategy(v) for v in fields},
             ),
         )
 
+    def _default_load_strategy(self, field: Union[str, QueryableAttribute]) -> JoinMethodType:
+        if isinstance(field, QueryableAttribute):
+            prop = field.property
+        elif RELATION_SPLITTER not in field and "." not in field and field in self.model._relations:
+            prop = getattr(self.model, field).property
+        else:
+            return JOINED
+        return SELECTIN if prop.uselist else JOINED
+
     def custom_query(self: SmartQueryType, build_query: CustomQueryBuilder) -> SmartQueryType:
         """
         有些情况，SmartQuery 无法满足需求，过程中需要由外部来进一步构造请求，
@@ -143,56 +162,98 @@ class SmartQuery(Generic[ModelType]):
 ## 以下代码主要摘自 sqlalchemy-mixins，根据实现不同稍微做了调整
 
 
-def _parse_path_and_make_aliases(
-    entity: "InspectionMixin", entity_path: str, attrs: List[str], aliases: Dict[str, Tuple]
-) -> None:
+# relation tree 中的一个节点: (path, parent_path, relation_name, relationship_path)
+# 如 ("product___grade", "product", "grade", "product.grade")
+RelationNode = Tuple[str, str, str, str]
+
+
+@functools.lru_cache(maxsize=1024)
+def _compute_relation_tree(root_cls: "InspectionMixin", attrs: Tuple[str, ...]) -> Tuple[RelationNode, ...]:
     """
-    :type entity: InspectionMixin
-    :type entity_path: str
-    :type attrs: list
-    :type aliases: OrderedDict
+    :type root_cls: InspectionMixin
+    :type attrs: tuple
+
+    解析 attrs 中用到的关系路径, 按需要 join 的顺序 (父节点在前) 返回 relation tree。
+    该结果只与 model 和 attrs 有关, 按 (root_cls, attrs) 缓存; 路径不合法时抛出 KeyError。
 
     Sample values:
 
-    attrs: ['product__subject_ids', 'user_id', '-group_id',
-            'user__name', 'product__name', 'product__grade_from__order']
-    relations: {'product': ['subject_ids', 'name'], 'user': ['name']}
+    attrs: ('product___subject_ids', 'user_id', 'group_id',
+            'user___name', 'product___name', 'product___grade___order')
+    relations: {'product': ['subject_ids', 'name', 'grade___order'], 'user': ['name']}
+    """
+    tree: List[RelationNode] = []
+
+    def _walk(entity: "InspectionMixin", entity_path: str, attrs: Iterable[str]) -> None:
+        relations: Dict[str, List[str]] = {}
+        # take only attributes that have magic RELATION_SPLITTER
+        for attr in attrs:
+            # from attr (say, 'product__grade__order')  take
+            # relationship name ('product') and nested attribute ('grade__order')
+            relation_name, sep, nested_attr = attr.partition(RELATION_SPLITTER)
+            if sep:
+                if relation_name in relations:
+                    relations[relation_name].append(nested_attr)
+                else:
+                    relations[relation_name] = [nested_attr]
+
+        for relation_name, nested_attrs in relations.items():
+            path = entity_path + RELATION_SPLITTER + relation_name if entity_path else relation_name
+            if relation_name not in entity._relations:
+                raise KeyError(
+                    "Incorrect path `{}`: " "{} doesnt have `{}` relationship ".format(path, entity, relation_name)
+                )
+            tree.append((path, entity_path, relation_name, path.replace(RELATION_SPLITTER, ".")))
+            related_cls = getattr(entity, relation_name).property.mapper.class_
+            _walk(related_cls, path, nested_attrs)
+
+    _walk(root_cls, "", attrs)
+    return tuple(tree)
+
 
+def _materialize_aliases(root_cls: "InspectionMixin", tree: Tuple[RelationNode, ...], aliases: Dict[str, Tuple]) -> None:
     """
-    relations: Dict[str, List[str]] = {}
-    # take only attributes that have magic RELATION_SPLITTER
-    for attr in attrs:
-        # from attr (say, 'product__grade__order')  take
-        # relationship name ('product') and nested attribute ('grade__order')
-        if RELATION_SPLITTER in attr:
-            relation_name, nested_attr = attr.split(RELATION_SPLITTER, 1)
-            if relation_name in relations:
-                relations[relation_name].append(nested_attr)
-            else:
-                relations[relation_name] = [nested_attr]
-
-    for relation_name, nested_attrs in relations.items():
-        path = entity_path + RELATION_SPLITTER + relation_name if entity_path else relation_name
-        if relation_name not in entity._relations:
-            raise KeyError(
-                "Incorrect path `{}`: " "{} doesnt have `{}` relationship ".format(path, entity, relation_name)
-            )
-        relationship = getattr(entity, relation_name)
-        alias = aliased(relationship.property.mapper.class_)
-        aliases[path] = alias, relationship
-        _parse_path_and_make_aliases(alias, path, nested_attrs, aliases)  # type: ignore[arg-type]
-
-
-def _get_root_cls(query: Query) -> ModelType:
-    # sqlalchemy < 1.4.0
-    if hasattr(query, "_entity_zero"):
+    为 relation tree 中的每个节点创建 alias, 写入 aliases: {path: (alias, relationship)}。
+    alias 每次查询都需要新建, 但不再重复解析路径。
+    """
+    for path, parent_path, relation_name, _ in tree:
+        parent = aliases[parent_path][0] if parent_path else root_cls
+        relationship = getattr(parent, relation_name)
+        aliases[path] = aliased(relationship.property.mapper.class_), relationship
+
+
+@functools.lru_cache(maxsize=1024)
+def _split_attr(attr: str) -> Tuple[str, str, bool]:
+    """
+    将 filter/sort 的属性拆分为 (关系路径, 属性名, 是否降序), 没有关系路径时为 ""。如:
+
+        "-product___grade___order" => ("product___grade", "order", True)
+        "name__like" => ("", "name__like", False)
+    """
+    is_desc = attr[:1] == DESC_PREFIX
+    if is_desc:
+        attr = attr[1:]
+    relation_path, _, attr_name = attr.rpartition(RELATION_SPLITTER)
+    return relation_path, attr_name, is_desc
+
+
+# SQLAlchemy 的版本在运行时不会变化, 在 import 时确定一次取 root class 的方式即可
+# sqlalchemy < 1.4.0
+if hasattr(Query, "_entity_zero"):
+
+    def _get_root_cls(query: Query) -> Type["Model"]:
         return query._entity_zero().class_  # type: ignore[attr-defined]
 
-    # sqlalchemy >= 1.4.0
-    else:
-        if hasattr(query, "_entity_from_pre_ent_zero"):
-            return query._entity_from_pre_ent_zero().class_  # type: ignore[attr-defined]
-    raise ValueError("Cannot get a root class from`{}`".format(query))
+# sqlalchemy >= 1.4.0
+elif hasattr(Query, "_entity_from_pre_ent_zero"):
+
+    def _get_root_cls(query: Query) -> Type["Model"]:
+        return query._entity_from_pre_ent_zero().class_  # type: ignore[attr-defined]
+
+else:
+
+    def _get_root_cls(query: Query) -> Type["Model"]:
+        raise ValueError("Cannot get a root class from`{}`".format(query))
 
 
 def smart_query(
@@ -213,6 +274,10 @@ def smart_query(
     :param sort_attrs: List[basestring]
     :param schema: dict
     """
+    # 没有任何条件时原样返回, 不需要解析关系路径
+    if not filters and not sort_attrs and not schema:
+        return query
+
     if not filters:
         filters = {}
     if not sort_attrs:
@@ -221,7 +286,6 @@ def smart_query(
     #  Load schema early since we need it to check whether we should eager load a relationship
     if schema:
         flat_schema = _flatten_schema(schema)
-        # print(flat_schema)
     else:
         flat_schema = {}
 
@@ -235,46 +299,84 @@ def smart_query(
         query.session = sess
 
     root_cls: Type[Model] = _get_root_cls(query)  # for example, User or Post
-    attrs = list(filters.keys()) + list(map(lambda s: s.lstrip(DESC_PREFIX), sort_attrs))
-    aliases: Dict[str, Tuple] = OrderedDict({})
-    _parse_path_and_make_aliases(root_cls, "", attrs, aliases)  # type: ignore[arg-type]
-
-    loaded_paths = []
-    for path, al in aliases.items():
-        relationship_path = path.replace(RELATION_SPLITTER, ".")
-        if not (relationship_path in flat_schema and flat_schema[relationship_path] == SUBQUERY):
-            query = query.outerjoin(al[0], al[1]).options(contains_eager(relationship_path, alias=al[0]))
-            loaded_paths.append(relationship_path)
-
+    # 排序字段只去掉一个 "-" 前缀, 与 _split_attr 保持一致
+    attrs = (*filters, *(s[1:] if s[:1] == DESC_PREFIX else s for s in sort_attrs))
+    aliases: Dict[str, Tuple] = {}
+    relation_tree = _compute_relation_tree(root_cls, attrs)  # type: ignore[arg-type]
+    _materialize_aliases(root_cls, relation_tree, aliases)  # type: ignore[arg-type]
+
+    # 过滤、排序条件和 loader option 先收集起来, 最后各调用一次 filter/order_by/options,
+    # 每次调用 Query 的这些方法都会复制出一个新的 Query 对象
+    # 用 subquery 方式加载的关系不需要 join
+    subquery_paths = frozenset(path for path, method in flat_schema.items() if method == SUBQUERY)
+    loaded_paths = set()
+    options = []
+    for path, _, _, relationship_path in relation_tree:
+        al = aliases[path]
+        if relationship_path not in subquery_paths:
+            query = query.outerjoin(al[0], al[1])
+            options.append(contains_eager(relationship_path, alias=al[0]))
+            loaded_paths.add(relationship_path)
+
+    # 每个 entity 的 _filter_expr/_order_expr 只查找一次, key 为关系路径 ("" 表示 root_cls)
+    filter_expr_funcs: Dict[str, Callable] = {"": root_cls._filter_expr}
+    order_expr_funcs: Dict[str, Callable] = {"": root_cls._order_expr}
+
+    # 同一个 entity 上的 filter 合并为一次 _filter_expr 调用, 由 _compile_filter_plan 按整组 key 缓存解析结果,
+    # 不再为每个属性单独构造一个 {attr_name: value} 再解包; 同时记录 attr_name 对应的原始 filter key, 出错时用于报告
+    entity_filters: Dict[str, Dict[str, Any]] = {}
+    entity_filter_keys: Dict[str, Dict[str, str]] = {}
     for attr, value in filters.items():
-        if RELATION_SPLITTER in attr:
-            parts = attr.rsplit(RELATION_SPLITTER, 1)
-            entity, attr_name = aliases[parts[0]][0], parts[1]
-        else:
-            entity, attr_name = root_cls, attr
+        relation_path, _, attr_name = attr.rpartition(RELATION_SPLITTER)
+        group = entity_filters.get(relation_path)
+        if group is None:
+            group = entity_filters[relation_path] = {}
+            entity_filter_keys[relation_path] = {}
+        group[attr_name] = value
+        entity_filter_keys[relation_path][attr_name] = attr
+
+    filter_exprs = []
+    for relation_path, group in entity_filters.items():
+        filter_expr = filter_expr_funcs.get(relation_path)
+        if filter_expr is None:
+            filter_expr = filter_expr_funcs[relation_path] = aliases[relation_path][0]._filter_expr
         try:
-            query = query.filter(*entity._filter_expr(**{attr_name: value}))
+            filter_exprs.extend(filter_expr(**group))
         except KeyError as e:
-            raise KeyError("Incorrect filter path `{}`: {}".format(attr, e))
-
+            # 出错时逐个 key 重试, 找到具体是哪个 filter path 不合法
+            filter_keys = entity_filter_keys[relation_path]
+            for attr_name, value in group.items():
+                try:
+                    filter_expr(**{attr_name: value})
+                except KeyError as key_error:
+                    raise KeyError("Incorrect filter path `{}`: {}".format(filter_keys[attr_name], key_error))
+            raise KeyError("Incorrect filter path `{}`: {}".format("`, `".join(filter_keys.values()), e))
+
+    order_exprs = []
     for attr in sort_attrs:
-        if RELATION_SPLITTER in attr:
-            prefix = ""
-            if attr.startswith(DESC_PREFIX):
-                prefix = DESC_PREFIX
-                attr = attr.lstrip(DESC_PREFIX)
-            parts = attr.rsplit(RELATION_SPLITTER, 1)
-            entity, attr_name = aliases[parts[0]][0], prefix + parts[1]
-        else:
-            entity, attr_name = root_cls, attr
+        relation_path, attr_name, is_desc = _split_attr(attr)
+        order_expr = order_expr_funcs.get(relation_path)
+        if order_expr is None:
+            order_expr = order_expr_funcs[relation_path] = aliases[relation_path][0]._order_expr
+        if relation_path and is_desc:
+            attr = attr[1:]
+        if is_desc:
+            attr_name = DESC_PREFIX + attr_name
         try:
-            query = query.order_by(*entity._order_expr(attr_name))
+            order_exprs.extend(order_expr(attr_name))
         except KeyError as e:
             raise KeyError("Incorrect order path `{}`: {}".format(attr, e))
 
+    if filter_exprs:
+        query = query.filter(*filter_exprs)
+    if order_exprs:
+        query = query.order_by(*order_exprs)
+
     if flat_schema:
-        not_loaded_part = {path: v for path, v in flat_schema.items() if path not in loaded_paths}
-        query = query.options(*_eager_expr_from_flat_schema(not_loaded_part))
+        not_loaded_part = tuple((path, v) for path, v in flat_schema.items() if path not in loaded_paths)
+        options.extend(_eager_options(not_loaded_part))
+    if options:
+        query = query.options(*options)
 
     return query
 
@@ -284,39 +386,53 @@ def eager_expr(schema: EagerSchemaType) -> list:
     :type schema: dict
     """
     flat_schema = _flatten_schema(schema)
-    return _eager_expr_from_flat_schema(flat_schema)
+    return list(_eager_options(tuple(flat_schema.items())))
+
+
+def _freeze_schema(schema: EagerSchemaType) -> tuple:
+    """
+    将 schema 转换为可 hash 的嵌套 tuple: ((path, join_method, inner_or_None), ...),
+    作为 _flatten_schema 的缓存 key。
+    """
+    items = []
+    for path, value in schema.items():
+        # for supporting schemas like Product.user: {...},
+        # we transform, say, Product.user to 'user' string
+        if isinstance(path, QueryableAttribute):
+            path = path.key
+
+        if isinstance(value, tuple):
+            join_method, inner_schema = value[0], value[1]
+        elif isinstance(value, dict):
+            join_method, inner_schema = JOINED, value
+        else:
+            join_method, inner_schema = value, None
+
+        items.append((path, join_method, _freeze_schema(inner_schema) if inner_schema else None))
+    return tuple(items)
 
 
 def _flatten_schema(schema: EagerSchemaType) -> EagerFlatSchemaType:
     """
     :type schema: dict
+
+    注意: 返回值会被缓存, 调用方不能修改它。
     """
+    return _flatten_frozen_schema(_freeze_schema(schema))
 
-    def _flatten(schema: EagerSchemaType, parent_path: str, result: EagerFlatSchemaType) -> None:
-        """
-        :type schema: dict
-        """
-        for path, value in schema.items():
-            # for supporting schemas like Product.user: {...},
-            # we transform, say, Product.user to 'user' string
-            if isinstance(path, InstrumentedAttribute):
-                path = path.key
-
-            if isinstance(value, tuple):
-                join_method, inner_schema = value[0], value[1]
-            elif isinstance(value, dict):
-                join_method, inner_schema = JOINED, value
-            else:
-                join_method, inner_schema = value, None
-
-            full_path: str = parent_path + "." + path if parent_path else path  # type: ignore[assignment]
+
+@functools.lru_cache(maxsize=256)
+def _flatten_frozen_schema(frozen_schema: tuple) -> EagerFlatSchemaType:
+    def _flatten(frozen_schema: tuple, parent_path: str, result: EagerFlatSchemaType) -> None:
+        for path, join_method, inner_schema in frozen_schema:
+            full_path: str = parent_path + "." + path if parent_path else path
             result[full_path] = join_method
 
             if inner_schema:
                 _flatten(inner_schema, full_path, result)
 
     result: EagerFlatSchemaType = {}
-    _flatten(schema, "", result)
+    _flatten(frozen_schema, "", result)
     return result
 
 
@@ -324,12 +440,22 @@ def _eager_expr_from_flat_schema(flat_schema: EagerFlatSchemaType) -> list:
     """
     :type flat_schema: dict
     """
+    return list(_eager_options(tuple(flat_schema.items())))
+
+
+@functools.lru_cache(maxsize=256)
+def _eager_options(flat_items: Tuple[Tuple[str, JoinMethodType], ...]) -> tuple:
+    """
+    loader option 对象可以在多个 query 之间复用, 按 flat schema 的内容缓存
+    """
     result = []
-    for path, join_method in flat_schema.items():
+    for path, join_method in flat_items:
         if join_method == JOINED:
             result.append(joinedload(path))
         elif join_method == SUBQUERY:
             result.append(subqueryload(path))
+        elif join_method == SELECTIN:
+            result.append(selectinload(path))
         else:
             raise ValueError("Bad join method `{}` in `{}`".format(join_method, path))
-    return result
+    return tuple(result)
@@ -25,19 +25,27 @@ class PaginationParams:
 
 
 class APIResponse:
+    # 每个请求都会创建一个响应对象, 只保存 content, 不需要实例 __dict__;
+    # status_code/response_model 为类属性, 需要临时指定 response_model 时通过 render_content 的参数传入
+    __slots__ = ("content",)
+
     status_code: int = 200
     response_model: Optional[Type[Any]] = APIResponseModel
 
     def __init__(self, **kwargs):
-        self.content = self.render_content(**kwargs)
+        self.content = self.render_content(self.response_model, **kwargs)
 
-    def render_content(self, **kwargs):
-        if not self.response_model:
+    def render_content(self, response_model: Optional[Type[Any]], **kwargs):
+        if not response_model:
             if "content" not in kwargs:
                 raise RuntimeError(f"{self.__class__.__name__}: 未指定response_model, 必须提供content参数")
-            return (dict(kwargs["content"]), self.status_code)
+            content = kwargs["content"]
+            # 已经是 dict 时直接使用, 不再复制一份
+            return (content if content.__class__ is dict else dict(content), self.status_code)
         # 这里在实际使用Model和BaseModel的时候可能会报错, 持续关注
-        return (dict(convert(self.response_model, kwargs, self.__class__.__name__)), self.status_code)
+        value = convert(response_model, kwargs, self.__class__.__name__)
+        # 浅转换即可, 嵌套的 model 由 orjson + pydantic_encoder 序列化
+        return (dict(value), self.status_code)
 
 
 class Ok(APIResponse):
@@ -45,6 +53,8 @@ class Ok(APIResponse):
     可以返回空, message, 和单个model的数据
     """
 
+    __slots__ = ()
+
     status_code = 200
     response_model: Optional[Type[Any]] = OkResponseModel
 
@@ -70,19 +80,16 @@ class Ok(APIResponse):
         if response_model is not None:
             if data is ...:
                 raise ValueError(f"{self.__class__.__name__}: 提供 response_model 时, 必须提供 data")
-            # 将 response_model 设置为 None, 从而 APIResponse 中不再做序列化
-            self.response_model = None
+            # response_model 传 None, 从而 render_content 中不再做序列化
             content = convert(response_model, data)
-            super().__init__(content=content)
+            self.content = self.render_content(None, content=content)
         elif message is not None:
-            self.response_model = None
             content = dict(message=message)
-            super().__init__(content=content)
+            self.content = self.render_content(None, content=content)
         elif data is not ...:
-            self.response_model = None
-            super().__init__(content=data)
+            self.content = self.render_content(None, content=data)
         else:
-            super().__init__(content={})
+            self.content = self.render_content(None, content={})
 
 
 class Full(APIResponse):
@@ -90,6 +97,8 @@ class Full(APIResponse):
     不做分页处理的数据
     """
 
+    __slots__ = ()
+
     status_code = 200
     response_model = None
 
@@ -112,6 +121,8 @@ class Page(APIResponse):
     TODO：需要完善
     """
 
+    __slots__ = ()
+
     status_code = 200
     response_model = None
 
@@ -124,39 +135,52 @@ class Page(APIResponse):
         ...
 
     def __init__(self, item_model, *, query=None, page_params=None, items=None, pagination=None):
-        self.response_model = PageResponseModel[item_model]
         if query is not None:
             if isinstance(query, SmartQuery):
                 query = query.query
             items, pagination = get_pagination(query, page=page_params.page, page_size=page_params.page_size)
-        super().__init__(data=items, pagination=pagination, total=pagination["total"])
+        self.content = self.render_content(
+            PageResponseModel[item_model], data=items, pagination=pagination, total=pagination["total"]
+        )
 
 
 class BadRequest(APIResponse):
+    __slots__ = ()
+
     status_code = 400
     response_model = BadRequestResponseModel
 
 
 class BizError(APIResponse):
+    __slots__ = ()
+
     status_code = 400
     response_model = BizErrorResponseModel
 
 
 class NotAuthorized(APIResponse):
+    __slots__ = ()
+
     status_code = 401
     response_model = NotAuthorizedResponseModel
 
 
 class Forbidden(APIResponse):
+    __slots__ = ()
+
     status_code = 403
     response_model = ForbiddenResponseModel
 
 
 class NotFound(APIResponse):
+    __slots__ = ()
+
     status_code = 404
     response_model = NotFoundResponseModel
 
 
 class NotImplemented(APIResponse):
+    __slots__ = ()
+
     status_code = 501
     response_model = NotImplementedResponseModel
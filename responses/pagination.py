@@ -1,25 +1,61 @@
-import math
-from typing import List, Tuple
+from typing import Any, List, Tuple
 
+from sqlalchemy import func
 from sqlalchemy.orm import Query
 
 from db.model import Model
 
 
-def get_pagination(query: Query, page: int = 1, page_size: int = 10) -> Tuple[List[Model], dict]:
+def _supports_window_functions(dialect: Any) -> bool:
+    """
+    数据库是否支持窗口函数: SQLite 3.25、MySQL 8.0、MariaDB 10.2 起才支持;
+    MySQL/MariaDB 尚未连接、拿不到版本号时按不支持处理
+    """
+    if dialect.name == "sqlite":
+        return dialect.dbapi.sqlite_version_info >= (3, 25)
+    if dialect.name in ("mysql", "mariadb"):
+        version = dialect.server_version_info
+        if not version:
+            return False
+        return version >= ((10, 2) if getattr(dialect, "is_mariadb", False) else (8, 0))
+    return True
+
+
+def get_pagination(
+    query: Query, page: int = 1, page_size: int = 10, window_count: bool = True
+) -> Tuple[List[Model], dict]:
+    """
+    window_count: 是否允许通过 COUNT(*) OVER() 在取当前页数据的同一条 SQL 中取回总数。
+    DISTINCT 在窗口函数之后执行, 此时窗口函数得到的不是去重后的总数, 使用了 distinct() 的查询需要传入 False
+    """
     if page <= 0:
         raise AttributeError("page needs to be >= 1")
     if page_size <= 0:
         raise AttributeError("page_size needs to be >= 1")
 
-    items = query.limit(page_size).offset((page - 1) * page_size).all()
-    total = query.order_by(None).count()
+    offset = (page - 1) * page_size
+    # 只查询单个 model 且数据库支持窗口函数时, 通过 COUNT(*) OVER() 把总数和当前页数据放在同一条 SQL 中取回,
+    # 省一次数据库往返
+    descriptions = query.column_descriptions
+    if (
+        window_count
+        and len(descriptions) == 1
+        and descriptions[0]["expr"] is descriptions[0]["entity"]
+        and _supports_window_functions(query.session.get_bind().dialect)
+    ):
+        rows = query.add_columns(func.count().over()).limit(page_size).offset(offset).all()
+        items = [row[0] for row in rows]
+        # 当前页没有数据 (如页码超出范围) 时拿不到总数, 再单独 count 一次
+        total = rows[0][1] if rows else query.order_by(None).count()
+    else:
+        items = query.limit(page_size).offset(offset).all()
+        total = query.order_by(None).count()
 
     pagination = dict(
         total=total,
         page=page,
         page_size=page_size,
-        last_page=int(math.ceil(total / float(page_size))),
+        last_page=-(-total // page_size),
     )
 
     return (items, pagination)
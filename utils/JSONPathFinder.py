@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Union
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple, Union
 
 
 class JsonPathFinder:
@@ -18,22 +18,50 @@ class JsonPathFinder:
         else:
             return
         for key, value in key_value_iter:
-            current_path = road_step.copy()
-            current_path.append(key)
+            current_path = road_step + [key]
             if key == target:
                 yield current_path
             if isinstance(value, (dict, list)):
                 yield from self.iter_node(value, current_path, target)  # type:ignore[arg-type]
 
+    def _search(self, target: Any, first_only: bool) -> List[List[Any]]:
+        """
+        与 iter_node 的遍历顺序相同 (深度优先、先序), 但使用显式的栈代替生成器递归,
+        也不受 Python 递归深度的限制; first_only 为 True 时找到第一个匹配的 key 后立即返回
+        """
+        # 栈中每一项为 (尚未遍历完的 (key, value) 迭代器, 到达该层的路径)
+        stack: List[Tuple[Iterator[Tuple[Any, Any]], List[Any]]]
+        if isinstance(self.data, dict):
+            stack = [(iter(self.data.items()), [])]
+        elif isinstance(self.data, list):
+            stack = [(enumerate(self.data), [])]
+        else:
+            return []
+        result: List[List[Any]] = []
+        while stack:
+            key_value_iter, road_step = stack[-1]
+            for key, value in key_value_iter:
+                current_path = road_step + [key]
+                if key == target:
+                    result.append(current_path)
+                    if first_only:
+                        return result
+                if isinstance(value, dict):
+                    stack.append((iter(value.items()), current_path))
+                    break
+                if isinstance(value, list):
+                    stack.append((enumerate(value), current_path))
+                    break
+            else:
+                stack.pop()
+        return result
+
     def find_one(self, key: str) -> List[Any]:
-        path_iter = self.iter_node(self.data, [], key)
-        for path in path_iter:
-            return path  # type: ignore[return-value]
-        return []
+        result = self._search(key, True)
+        return result[0] if result else []
 
     def find_all(self, key: str) -> List[Any]:
-        path_iter = self.iter_node(self.data, [], key)
-        return list(path_iter)
+        return self._search(key, False)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any, ClassVar, Dict, List, Mapping, Type, TypeVar, Union
+from typing import Any, ClassVar, Dict, List, Mapping, Set, Tuple, Type, TypeVar, Union
 
 import yaml
 from pydantic import BaseModel
@@ -11,18 +11,29 @@ from fastframe.utils.functional import SimpleLazyObject
 
 def _merge_dict(a: dict, b: dict, *others: dict) -> dict:
     """
-    merge dict a and b, return a new dict
+    merge dict a and b (and others), return a new dict
+
+    使用显式的栈代替递归; 参与合并的 dict 都不会被修改, 只有两边都是 dict 的 key
+    才会复制一份嵌套的 dict 再原地合并
     """
     dst = a.copy()
-    for k, v in b.items():
-        if k in dst and isinstance(dst[k], dict) and isinstance(b[k], Mapping):
-            dst[k] = _merge_dict(dst[k], b[k])
-        else:
-            dst[k] = b[k]
-    if others:
-        return _merge_dict(dst, *others)
-    else:
-        return dst
+    # 记录已经复制过的嵌套 dict, 后续再合并到同一个 key 时直接原地修改
+    owned: Set[int] = {id(dst)}
+    # 栈是后进先出, 逆序压入, 保证按 b, *others 的顺序合并
+    stack: List[Tuple[dict, Mapping]] = [(dst, src) for src in reversed((b,) + others)]
+    while stack:
+        target, source = stack.pop()
+        for k, v in source.items():
+            sub: Any = target.get(k)
+            # yaml 解析出的都是普通 dict, 先做 __class__ 比较, 不是 dict 时再走 isinstance/Mapping 的检查
+            if (sub.__class__ is dict or isinstance(sub, dict)) and (v.__class__ is dict or isinstance(v, Mapping)):
+                if id(sub) not in owned:
+                    sub = target[k] = sub.copy()
+                    owned.add(id(sub))
+                stack.append((sub, v))
+            else:
+                target[k] = v
+    return dst
 
 
 def env_values(*, default: Any, **kwargs: Any) -> Any:
@@ -40,9 +51,7 @@ def env_values(*, default: Any, **kwargs: Any) -> Any:
     * 请总是提供 default 值，如果没有合理的 default 值，可在调用时传入 None 或 ...，
       并在 validator 中处理该值。
     """
-    if ENV_NAME in kwargs:
-        return kwargs[ENV_NAME]
-    return default
+    return kwargs.get(ENV_NAME, default)
 
 
 class BaseConfig(BaseModel):
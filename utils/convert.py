@@ -1,13 +1,11 @@
-from typing import Any, Dict, Type, TypeVar
+import functools
+from typing import Any, Type, TypeVar
 
 from pydantic import BaseConfig, BaseModel, ValidationError, create_model
 from pydantic.fields import ModelField
 
 InputType = TypeVar("InputType")
 
-_cached_fields: Dict[Type[Any], ModelField] = {}
-
-
 class ValidationErrorWrap(ValidationError):
     # pydantic.ValidationError() 期望第二个参数是一个 BaseModel 的子类，
     # 我们的 model 可能并不是 BaseModel（如 int, Union[int, str] 等），
@@ -24,24 +22,24 @@ class ValidationErrorWrap(ValidationError):
             super().__init__(errors, model)
 
 
+@functools.lru_cache(maxsize=None)
 def create_model_field(model: Type[Any], name: str = "field") -> ModelField:
-    if model not in _cached_fields:
-        _cached_fields[model] = ModelField(
-            name=name,
-            type_=model,
-            class_validators=None,
-            model_config=BaseConfig,
-            required=True,
-        )
-
-    return _cached_fields[model]
+    return ModelField(
+        name=name,
+        type_=model,
+        class_validators=None,
+        model_config=BaseConfig,
+        required=True,
+    )
 
 
 def convert(model: Type[InputType], data: Any, loc: str = "data") -> InputType:
     """
     给定任意类型，将提供的数据转化为该类型。主要结合pydantic使用
     """
-    field = create_model_field(model)
+    # lru_cache 要求参数为 Hashable, mypy 不认为 Type[InputType] 满足该协议, 这里以 type 传入
+    model_type: type = model
+    field = create_model_field(model_type)
     value, errors = field.validate(data, {}, loc=(loc,))
     if errors:
         raise ValidationErrorWrap([errors], field.type_)
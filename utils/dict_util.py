@@ -1,5 +1,6 @@
-import copy
-from typing import Any, Dict, List, Optional, TypeVar, Union
+from functools import partial, reduce
+from operator import getitem
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
 
 # class DictKeyError(KeyError):
 #     pass
@@ -21,6 +22,15 @@ PathlistType = List[PathType]
 FinalType = Dict[T, W]
 
 
+def _make_path_getter(path: PathType) -> Callable[[Any], Any]:
+    """
+    为 path 生成取值函数, 如 ["field", "column", "n1"] 生成的函数等价于 lambda x: x["field"]["column"]["n1"]。
+
+    partial、reduce、getitem 都是 C 实现, 逐层取值时不经过 Python 层的函数调用。
+    """
+    return partial(reduce, getitem, path)
+
+
 class MergeDictTool:
     """
     @Date:          4/28/2020, 17:11
@@ -51,11 +61,13 @@ class MergeDictTool:
         self.pathlist: PathlistType = []
         self.blanktemplate: FinalType = {}
         self.pre_result: FinalType = {}
+        # (取值函数, blanktemplate 中叶子 list 的引用), 与 pathlist 一一对应, 由 buildblankdict 生成
+        self._leaf_refs: List[Tuple[Callable[[Any], Any], EmptyList]] = []
         if targetsList is not None and targetsList != []:
             self.analysisPath(targetsList[0])
             self.blanktemplate = self.buildblankdict()
             self.targetlist = targetsList
-            self.pre_result = copy.deepcopy(self.blanktemplate)
+            self.pre_result = self._copy_template(self.blanktemplate)
             self.combine()
 
     def analysisPath(self, sampleitem: TargetItemType, singletemppath: Optional[PathType] = None) -> None:
@@ -67,14 +79,13 @@ class MergeDictTool:
         self.pathlist ->
             [["field", "column", "n1"], ["field", "column", "n2"], [...] ...]
         """
+        if singletemppath is None:
+            singletemppath = []
         for key, val in sampleitem.items():
-            singlepath = copy.deepcopy(singletemppath) if singletemppath is not None else []
             if isinstance(val, dict):
-                singlepath.append(key)
-                self.analysisPath(val, singlepath)
+                self.analysisPath(val, singletemppath + [key])
             else:
-                singlepath.append(key)
-                self.pathlist.append(singlepath)
+                self.pathlist.append(singletemppath + [key])
 
     def buildblankdict(self) -> BlankTemplateType:
         """
@@ -85,8 +96,7 @@ class MergeDictTool:
         temp_results: List[BlankTemplateType] = []
         results: BlankTemplateType = {}
         for path in self.pathlist:
-            temp_path = copy.deepcopy(path)
-            temp_path.reverse()
+            temp_path = path[::-1]
             value: EmptyList = []
             middle: BlankTemplateType = {}
             for key in temp_path:
@@ -100,6 +110,9 @@ class MergeDictTool:
             temp_results.append(middle)
         for each in temp_results:
             results = self._merge_dict(results, each)
+        # _merge_dict 只做浅拷贝, 叶子 list 即为上面创建的对象, 这里记录下来, combine 时直接 append
+        getters = [_make_path_getter(path) for path in self.pathlist]
+        self._leaf_refs = [(getter, getter(results)) for getter in getters]
         return results
 
     def getPathValue(self, singleitem: TargetItemType, path: PathType) -> Any:
@@ -110,13 +123,7 @@ class MergeDictTool:
         根据提供的path路径，获取对应的值
         默认情况下所有的singleitem层级都是相同的，不需要另外判断
         """
-        result: Any = None
-        for each_key in path:
-            if result is None:
-                result = singleitem[each_key]
-                continue
-            if isinstance(result, dict):
-                result = result[each_key]
+        result: Any = reduce(getitem, path, singleitem)
 
         if result is None or isinstance(result, dict):
             raise ValueError("空值错误或者值类型错误(也可能是层级不匹配)")
@@ -159,8 +166,10 @@ class MergeDictTool:
             if isinstance(val, dict):
                 self.statistic(val)
             elif isinstance(val, list):
-                if all([isinstance(each, (int, float)) for each in val]):
-                    result[key] = [min(val), sorted(val)[len(val) // 2], max(val)]
+                if val and all(isinstance(each, (int, float)) for each in val):
+                    # 排序一次即可同时得到最小值、中位数 (偶数个时取靠后的一个) 和最大值
+                    ordered = sorted(val)
+                    result[key] = [ordered[0], ordered[len(ordered) // 2], ordered[-1]]
 
     def addItem(self, item: TargetItemType) -> None:
         if item == {}:
@@ -169,7 +178,7 @@ class MergeDictTool:
             self.analysisPath(item)
 
         if self.pre_result == {}:
-            self.pre_result = copy.deepcopy(self.blanktemplate)
+            self.pre_result = self._copy_template(self.blanktemplate)
 
         for path in self.pathlist:
             try:
@@ -183,23 +192,44 @@ class MergeDictTool:
         if self.pathlist is not []:
             result = self.blanktemplate
             for each_item in self.targetlist:
-                for each_path in self.pathlist:
-                    value = self.getPathValue(each_item, each_path)
-                    self.setPathValue(result, each_path, value)
+                for getter, leaf in self._leaf_refs:
+                    value = getter(each_item)
+                    if value is None or isinstance(value, dict):
+                        raise ValueError("空值错误或者值类型错误(也可能是层级不匹配)")
+                    if isinstance(value, (list, tuple, set)):
+                        leaf.extend(value)
+                    else:
+                        leaf.append(value)
             # self.statistic(result)
             return result
         return None
 
-    def _merge_dict(self, a: FinalType, b: FinalType, *others: FinalType) -> FinalType:
+    def _copy_template(self, template: Dict[Any, Any]) -> Dict[Any, Any]:
+        """
+        复制模板: path 中的 key 都是不可变对象, 只需要逐层重建 dict, 并复制叶子上的 list,
+        不需要走 copy.deepcopy 的通用流程
+        """
+        result: Dict[Any, Any] = {}
+        for key, val in template.items():
+            if isinstance(val, dict):
+                result[key] = self._copy_template(val)
+            elif isinstance(val, list):
+                result[key] = list(val)
+            else:
+                result[key] = val
+        return result
+
+    def _merge_dict(self, a: Dict[Any, Any], b: Dict[Any, Any], *others: Dict[Any, Any]) -> Dict[Any, Any]:
         """
         单纯的merge 两个dict，相同key会覆盖
         """
         dst = a.copy()
         for k, v in b.items():
-            if k in dst and isinstance(dst[k], dict) and isinstance(b[k], dict):
-                dst[k] = self._merge_dict(dst[k], b[k])
+            sub: Any = dst.get(k)
+            if sub.__class__ is dict and v.__class__ is dict:
+                dst[k] = self._merge_dict(sub, v)
             else:
-                dst[k] = b[k]
+                dst[k] = v
         if others:
             return self._merge_dict(dst, *others)
         else:
@@ -6,6 +6,7 @@
 
 import copy
 import operator
+import weakref
 
 empty = object()
 
@@ -195,11 +196,22 @@ class classproperty(object):
 
 
 class cached_classproperty(object):
+    """
+    只计算一次的 classproperty, 结果按类分别缓存 (子类不会拿到父类的值)。
+
+    调用 clear() 可清空缓存。
+    """
+
     def __init__(self, fget):
         self.fget = fget
-        self._cached_value = ...
+        self._cache = weakref.WeakKeyDictionary()
 
     def __get__(self, instance, cls):
-        if self._cached_value is ...:
-            self._cached_value = self.fget(cls)
-        return self._cached_value
+        try:
+            return self._cache[cls]
+        except KeyError:
+            value = self._cache[cls] = self.fget(cls)
+            return value
+
+    def clear(self):
+        self._cache.clear()
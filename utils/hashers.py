@@ -94,17 +94,24 @@ def get_hasher(algorithm="default"):
             )
 
 
+@functools.lru_cache(maxsize=8)
+def _get_hasher_by_prefix(algorithm: str) -> Any:
+    # 只按算法前缀缓存 (取值有限), 不按完整的 encoded 缓存
+    return get_hasher(algorithm)
+
+
 def identify_hasher(encoded: str) -> Any:
+    encoded_len = len(encoded)
     # Ancient versions of Django created plain MD5 passwords and accepted
     # MD5 passwords with an empty salt.
-    if (len(encoded) == 32 and "$" not in encoded) or (len(encoded) == 37 and encoded.startswith("md5$$")):
+    if (encoded_len == 32 and "$" not in encoded) or (encoded_len == 37 and encoded.startswith("md5$$")):
         algorithm = "unsalted_md5"
     # Ancient versions of Django accepted SHA1 passwords with an empty salt.
-    elif len(encoded) == 46 and encoded.startswith("sha1$$"):
+    elif encoded_len == 46 and encoded.startswith("sha1$$"):
         algorithm = "unsalted_sha1"
     else:
-        algorithm = encoded.split("$", 1)[0]
-    return get_hasher(algorithm)
+        algorithm = encoded.partition("$")[0]
+    return _get_hasher_by_prefix(algorithm)
 
 
 class BasePasswordHasher:
@@ -10,6 +10,15 @@ def is_valid_idcard(idcard: str) -> bool:
     if not re.match(IDCARD_REGEX, idcard):
         return False
 
+    ## 校验码表
+    ckcodes = ("1", "0", "X", "9", "8", "7", "6", "5", "4", "3", "2")
+
+    digits = idcard[:-1]
+    if len(digits) <= 17 and digits.isascii() and digits.isdigit():
+        # 加权因子为 2^(17-i) mod 11，而 13 ≡ 2 (mod 11)，按 13 进制解析后乘以 2 的幂即得到加权和模 11 的结果，
+        # 整个计算在 int() 中完成，不需要逐位转换和相乘
+        return ckcodes[pow(2, 18 - len(digits), 11) * int(digits, 13) % 11] == idcard[-1].upper()
+
     items = [int(item) for item in idcard[:-1]]
 
     ## 加权因子表
@@ -18,7 +27,4 @@ def is_valid_idcard(idcard: str) -> bool:
     ## 计算17位数字各位数字与对应的加权因子的乘积
     copulas = sum([a * b for a, b in zip(factors, items)])
 
-    ## 校验码表
-    ckcodes = ("1", "0", "X", "9", "8", "7", "6", "5", "4", "3", "2")
-
     return ckcodes[copulas % 11].upper() == idcard[-1].upper()
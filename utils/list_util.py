@@ -1,16 +1,20 @@
+import bisect
+import heapq
 from typing import List, TypeVar
 
 T = TypeVar("T")
 
 
 def cross_merge_list(front_list: List[T], back_list: List[T]) -> List[T]:
-    total_len = len(front_list) + len(back_list)
-    target_list: List[T] = []
-    for i in range(0, total_len - 1):
-        if len(front_list) != 0:
-            target_list.append(front_list.pop(0))
-        if len(back_list) != 0:
-            target_list.append(back_list.pop(0))
+    """
+    交叉合并两个列表: front[0], back[0], front[1], back[1], ..., 较长列表多出的部分按原顺序接在末尾。
+    不会修改传入的列表。
+    """
+    common_len = min(len(front_list), len(back_list))
+    target_list: List[T] = [None] * (common_len * 2)  # type: ignore[list-item]
+    target_list[0::2] = front_list[:common_len]
+    target_list[1::2] = back_list[:common_len]
+    target_list += front_list[common_len:] or back_list[common_len:]
     return target_list
 
 
@@ -22,33 +26,24 @@ def separate_list(originList: List[T], n: int) -> List[List[T]]:
 
 
 def merge_sorted_list(list1: List[int], list2: List[int]) -> List[int]:
-    cursor = 0
+    """
+    合并两个有序列表, 返回新的有序列表, 不会修改传入的列表。
+    heapq.merge 即双指针归并, 整体 O(n + m)。
 
-    # 使用长数组做原数组
-    olist, poplist = (list1, list2) if (len(list1) >= len(list2)) else (list2, list1)
-    # olist, poplist = (ll1, ll2) if (len(ll1) >= len(ll2)) else (ll2, ll1)
-    # 短数组弹出首元素
-    while len(poplist) > 0:
-        tmp = poplist.pop(0)
-        # 因为是有序数组，所以可以记录当前插入位置的下标
-        # 作为下次对比时的首位，可以有效减少遍历次数
-        for idx in range(cursor, len(olist)):
-            # 如果待插入元素小于当前对比元素，则插在当前位置
-            # 并且将游标后移以为，下次直接从下一位开始对比
-            if tmp < olist[idx]:
-                olist.insert(idx, tmp)
-                cursor = idx + 1
-                break
-            else:
-                # 如果插入元素时原数组最大元素则，插入最后
-                if len(olist) == cursor + 1:
-                    olist.insert(cursor + 1, tmp)
-                    cursor += 1
-                    break
-                # 如果插入元素大于当前元素，则直接将游标后移一位，进入下一次对比
-                cursor += 1
-                continue
-    return olist
+    一个列表远小于另一个 (短列表长度的平方小于长列表长度) 时, 复制长列表后用 bisect 逐个插入短列表的元素,
+    只需要二分查找和 C 层面的内存移动, 比逐个元素归并更快。
+    """
+    if len(list1) >= len(list2):
+        big, small, insort = list1, list2, bisect.insort_right
+    else:
+        # 值相等时 list1 的元素排在前面, 与 heapq.merge 保持一致
+        big, small, insort = list2, list1, bisect.insort_left
+    if len(small) * len(small) < len(big):
+        result = big[:]
+        for item in small:
+            insort(result, item)
+        return result
+    return list(heapq.merge(list1, list2))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,41 @@
+import os
+import secrets
 import string
+import threading
 
-import nanoid
+_ALPHABET = string.ascii_letters + string.digits
+# 随机字节通过 bytes.translate 映射为字母数字: 248 = 62 * 4, 大于等于 248 的字节直接丢弃,
+# 保证每个字符出现的概率相等
+_TRANSLATE_TABLE = (_ALPHABET * 5)[:256].encode("ascii")
+_REJECTED_BYTES = bytes(range(len(_ALPHABET) * 4, 256))
+
+# 每次从系统读取一批随机字节, 转换后放在池中, 多次调用共用一次 urandom
+_POOL_SIZE = 1024
+_pool = b""
+_pool_pos = 0
+_pool_lock = threading.Lock()
+
+
+def _reset_pool() -> None:
+    global _pool, _pool_pos
+    _pool, _pool_pos = b"", 0
+
+
+# fork 出的子进程 (如 gunicorn worker) 不能复用父进程池中的随机字节, 否则会生成相同的字符串
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool)
 
 
 def gen_random_str(n: int = 20) -> str:
-    return nanoid.generate(string.ascii_letters + string.digits, n)
+    global _pool, _pool_pos
+    if n <= 0:
+        return ""
+    with _pool_lock:
+        while len(_pool) - _pool_pos < n:
+            _pool = _pool[_pool_pos:] + secrets.token_bytes(max(_POOL_SIZE, n * 2)).translate(
+                _TRANSLATE_TABLE, _REJECTED_BYTES
+            )
+            _pool_pos = 0
+        result = _pool[_pool_pos : _pool_pos + n]
+        _pool_pos += n
+    return result.decode("ascii")
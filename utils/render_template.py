@@ -1,5 +1,7 @@
 import re
 
+KEY_PATTERN = re.compile(r"\${([^}]+)}")
+
 
 def render_content(content: str, paras: dict) -> str:
     """固定模版渲染
@@ -7,9 +9,7 @@ def render_content(content: str, paras: dict) -> str:
         content: "这里是一个变量:${var}, 这里是一个名称:${name}"
         paras: {"var": "variable", "name": "namespace"}
     """
-    KEY_PATTERN = re.compile(r"\${(?P<key>[^}]+)}")
-
-    return re.sub(KEY_PATTERN, lambda p: paras[p.group("key")], content)
+    return KEY_PATTERN.sub(lambda p: paras[p.group(1)], content)
 
 
 if __name__ == "__main__":
@@ -16,6 +16,12 @@ def getRangefDatetime(datefrom: str, dateto: str) -> List[datetime.datetime]:
     """
     dayto = parse(dateto)
     dayfrom = parse(datefrom)
-    numdays = dayto.day - dayfrom.day
-    date_list = [dayto - datetime.timedelta(days=x) for x in range(numdays + 1)]
+    # 按完整日期计算天数差, 只用 .day 相减时跨月的区间会算错
+    numdays = (dayto - dayfrom).days
+    one_day = datetime.timedelta(days=1)
+    date_list = []
+    day = dayto
+    for _ in range(numdays + 1):
+        date_list.append(day)
+        day -= one_day
     return date_list
@@ -3,7 +3,7 @@
 """
 
 from functools import cached_property
-from typing import TYPE_CHECKING, List, Type, TypeVar
+from typing import TYPE_CHECKING, Iterable, List, Tuple, Type, TypeVar
 
 CodeType = TypeVar("CodeType", bound="BaseCode")
 
@@ -26,6 +26,14 @@ class BaseCode:
     ZERO_CODE: str = "0" * LEVEL_LENGTH
     ROOT_CODE: str = "0" * CODE_LENGTH
 
+    # 以下由 _init_geometry 按子类的级宽、级数计算，避免每个实例重复计算
+    # _ZERO_POSTFIX[k] 为 k 级的 0，即 ZERO_CODE * k
+    _ZERO_POSTFIX: Tuple[str, ...]
+    # 第一个子节点的本级编码，如 "01"
+    _FIRST_LEVEL_CODE: str
+    # 本级编码的最大值，如 "99"
+    _MAX_LEVEL_CODE: str
+
     def __init__(self, code: str):
         if code == "root":
             code = self.ROOT_CODE
@@ -34,32 +42,59 @@ class BaseCode:
             # NOTE 后续考虑如何支持字母的情况
             raise ValueError(f"无效的编码，编码长度必须为 {self.CODE_LENGTH}，且全部为数字")
 
-        self.code: str = code
+        self._set_code(code)
 
-    @cached_property
-    def level(self) -> int:
+    def _set_code(self, code: str) -> None:
         """
-        返回当前编码的级别，返回值为 0..MAX_LEVEL
+        设置编码（code 需已通过校验），并计算 level、prefix、postfix
         """
-        level = self.MAX_LEVEL
-        while self.code[self.LEVEL_LENGTH * (level - 1) : self.LEVEL_LENGTH * level] == self.ZERO_CODE:
-            level -= 1
+        self.code: str = code
 
-        return level
+        # level、prefix、postfix 几乎总会用到，直接在初始化时计算为普通属性
+        # 去掉末尾的 0 后，剩余长度按级宽向上取整即为级别，rstrip 在 C 中一次扫描完成
+        level_length = self.LEVEL_LENGTH
+        level = (len(code.rstrip("0")) + level_length - 1) // level_length
+        # 当前编码的级别，取值为 0..MAX_LEVEL
+        self.level: int = level
+        # 从顶级至本级的编码，如 1230000000 -> 1230
+        self.prefix: str = code[: level * level_length]
+        # 本级别之后的所有 0，如  1230000000 -> 000000
+        self.postfix: str = self._ZERO_POSTFIX[self.MAX_LEVEL - level]
 
-    @cached_property
-    def prefix(self) -> str:
+    @classmethod
+    def _unchecked(cls: Type["CodeType"], code: str) -> "CodeType":
         """
-        返回从顶级至本级的编码，如 1230000000 -> 1230
+        跳过校验直接创建编码对象，只用于确定合法的编码（如由已有编码推导出的父节点、子节点编码）
         """
-        return self.code[: self.level * self.LEVEL_LENGTH]
+        obj = cls.__new__(cls)
+        obj._set_code(code)
+        return obj
 
-    @cached_property
-    def postfix(self) -> str:
+    @classmethod
+    def from_codes(cls: Type["CodeType"], codes: Iterable[str]) -> List["CodeType"]:
         """
-        返回本级别之后的所有 0，如  1230000000 -> 000000
+        批量创建编码对象，如加载整棵组织架构树时使用。
+
+        长度逐个检查，是否全为数字则拼接后一次检查；校验不通过时报错与逐个创建相同。
         """
-        return (self.MAX_LEVEL - self.level) * self.ZERO_CODE
+        codes = [cls.ROOT_CODE if code == "root" else code for code in codes]
+        code_length = cls.CODE_LENGTH
+        if any(len(code) != code_length for code in codes) or (codes and not "".join(codes).isdigit()):
+            # 逐个创建，由 __init__ 抛出具体的错误
+            return [cls(code) for code in codes]
+
+        return [cls._unchecked(code) for code in codes]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._init_geometry()
+
+    @classmethod
+    def _init_geometry(cls) -> None:
+        level_length, max_level = cls.LEVEL_LENGTH, cls.MAX_LEVEL
+        cls._ZERO_POSTFIX = tuple(cls.ZERO_CODE * k for k in range(max_level + 1))
+        cls._FIRST_LEVEL_CODE = "0" * (level_length - 1) + "1"
+        cls._MAX_LEVEL_CODE = "9" * level_length
 
     @cached_property
     def children_postfix(self) -> str:
@@ -69,7 +104,9 @@ class BaseCode:
         当需要获取某父节点的所有子节点时，可用以下条件筛选
         startswith=parent.prefix, endswith=parent.children_postfix
         """
-        return (self.MAX_LEVEL - self.level - 1) * self.ZERO_CODE
+        if self.level == self.MAX_LEVEL:
+            return ""
+        return self._ZERO_POSTFIX[self.MAX_LEVEL - self.level - 1]
 
     @cached_property
     def level_code(self) -> str:
@@ -83,7 +120,7 @@ class BaseCode:
         """
         返回该编码的下一个编码
         """
-        if self.level_code == "9" * self.LEVEL_LENGTH:
+        if self.level_code == self._MAX_LEVEL_CODE:
             raise ValueError("当前编码已达最大值")
         next_level_code = int(self.level_code) + 1
         return (
@@ -94,7 +131,7 @@ class BaseCode:
 
     @cached_property
     def next(self: "CodeType") -> "CodeType":
-        return self.__class__(self.next_code)
+        return self._unchecked(self.next_code)
 
     @cached_property
     def first_child_code(self) -> str:
@@ -103,11 +140,11 @@ class BaseCode:
         """
         if self.level == self.MAX_LEVEL:
             raise ValueError("当前编码级别已满，没有子节点")
-        return self.prefix + ("0" * (self.LEVEL_LENGTH - 1)) + "1" + self.ZERO_CODE * (self.MAX_LEVEL - self.level - 1)
+        return self.prefix + self._FIRST_LEVEL_CODE + self._ZERO_POSTFIX[self.MAX_LEVEL - self.level - 1]
 
     @cached_property
     def first_child(self: "CodeType") -> "CodeType":
-        return self.__class__(self.first_child_code)
+        return self._unchecked(self.first_child_code)
 
     @cached_property
     def parent_code(self) -> str:
@@ -117,11 +154,11 @@ class BaseCode:
         if self.level < 1:
             raise ValueError("当前编码为根节点，没有父节点")
 
-        return self.code[: (self.level - 1) * self.LEVEL_LENGTH] + self.ZERO_CODE * (self.MAX_LEVEL - self.level + 1)
+        return self.code[: (self.level - 1) * self.LEVEL_LENGTH] + self._ZERO_POSTFIX[self.MAX_LEVEL - self.level + 1]
 
     @cached_property
     def parent(self: "CodeType") -> "CodeType":
-        return self.__class__(self.parent_code)
+        return self._unchecked(self.parent_code)
 
     @classmethod
     def from_config(cls, name: str, level_length: int = 2, max_level: int = 10) -> Type["CodeType"]:
@@ -133,6 +170,7 @@ class BaseCode:
                 "MAX_LEVEL": max_level,
                 "CODE_LENGTH": level_length * max_level,
                 "ZERO_CODE": "0" * level_length,
+                "ROOT_CODE": "0" * (level_length * max_level),
             },
         )
 
@@ -141,12 +179,17 @@ class BaseCode:
         """
         返回根节点至该节点的所有编码
         """
-        if self.level == 0:
-            return []
-        if self.level == 1:
-            return [self.code]
-        else:
-            return self.parent.stack_codes + [self.code]
+        # 第 i 级祖先的编码即本编码的前 i 级加上补齐的 0，直接切片得到，不需要逐级创建父节点；
+        # 本级编码为 0 的级别不是祖先（父节点会直接跳过这一级），需要排除
+        code, level_length, max_level, zero_code = self.code, self.LEVEL_LENGTH, self.MAX_LEVEL, self.ZERO_CODE
+        return [
+            code[: i * level_length] + self._ZERO_POSTFIX[max_level - i]
+            for i in range(1, self.level + 1)
+            if code[(i - 1) * level_length : i * level_length] != zero_code
+        ]
+
+
+BaseCode._init_geometry()
 
 
 if TYPE_CHECKING:
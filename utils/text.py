@@ -4,6 +4,9 @@ def text_length(text: str) -> int:
     """
     try:
         str_len = len(str(text))
+        # 纯 ascii 文本 (最常见的情况) 每个字符都算 1 个, 不需要再编码一次
+        if text.isascii():
+            return str_len
         unicode_len = len(text.encode("utf-8"))
         return (unicode_len - str_len) // 2 + str_len
     except Exception:
@@ -1,14 +1,16 @@
-import functools
 from datetime import datetime, tzinfo
 from typing import Optional
 
 import pytz
 
 
-@functools.lru_cache()
+# 我们短期内没有国际化的需求，不需要处理时区问题，因此我们总是使用北京时区。
+# 时区不会变化，import 时创建一次即可
+_DEFAULT_TZ: tzinfo = pytz.timezone("Asia/Shanghai")
+
+
 def get_default_timezone() -> tzinfo:
-    # 我们短期内没有国际化的需求，不需要处理时区问题，因此我们总是使用北京时区
-    return pytz.timezone("Asia/Shanghai")
+    return _DEFAULT_TZ
 
 
 def now() -> datetime:
@@ -22,7 +24,7 @@ def now() -> datetime:
     # 后者快了一倍多，但后者返回的时间是 utc 时间，如果某些处理过程不支持时区（如
     # 某些库内置的 datetime 序列化代码，某些 ORM 等），则实际保存的时间可能发生
     # 时区错位。因此我们使用前者。
-    return datetime.now(get_default_timezone())
+    return datetime.now(_DEFAULT_TZ)
 
 
 # 以下代码直接摘自 Django 源码，将 get_current_timezone() 改为 get_default_timezone()
@@ -57,7 +59,7 @@ def is_naive(value: datetime) -> bool:
 def make_aware(value: datetime, timezone: tzinfo = None, is_dst: Optional[bool] = None) -> datetime:
     """Make a naive datetime.datetime in a given time zone aware."""
     if timezone is None:
-        timezone = get_default_timezone()
+        timezone = _DEFAULT_TZ
     if hasattr(timezone, "localize"):
         # This method is available for pytz time zones.
         return timezone.localize(value, is_dst=is_dst)  # type: ignore[attr-defined]
@@ -72,7 +74,7 @@ def make_aware(value: datetime, timezone: tzinfo = None, is_dst: Optional[bool]
 def make_naive(value: datetime, timezone: tzinfo = None) -> datetime:
     """Make an aware datetime.datetime naive in a given time zone."""
     if timezone is None:
-        timezone = get_default_timezone()
+        timezone = _DEFAULT_TZ
     # Emulate the behavior of astimezone() on Python < 3.6.
     if is_naive(value):
         raise ValueError("make_naive() cannot be applied to a naive datetime")
@@ -1,6 +1,10 @@
 import re
-from typing import Union
-from urllib.parse import ParseResult, parse_qsl, urlencode, urlparse, urlunparse
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+from urllib.parse import ParseResult, unquote_plus, urlencode, urlparse, urlunparse
+
+_SLASH_RE = re.compile(r"/+")
+# QueryString 中的 name=value 对，与 parse_qsl 的默认行为一致：没有 = 或 value 为空的参数会被忽略
+_QUERY_PAIR_RE = re.compile(r"(?:^|(?<=&))([^&=]*)=([^&]+)")
 
 
 class URL:
@@ -20,11 +24,20 @@ class URL:
         # * 如果 path 有连续的 /，修改为一个 /
         # * 如果 path 为空，修改为 /
         # 注，如果 path 不以 / 开头，应该在开头加上 /，但这里无需特殊处理，urlunparse 会自动添加
-        path = re.sub(r"/+", "/", self.parsed.path) or "/"
+        path = _SLASH_RE.sub("/", self.parsed.path) or "/"
 
         if path != self.parsed.path:
             self.parsed = self.parsed._replace(path=path)
 
+    @classmethod
+    def _from_normalized(cls, parsed: ParseResult) -> "URL":
+        """
+        使用 path 已经规范化过的 ParseResult 创建 URL，跳过 __init__ 中的解析和规范化
+        """
+        self = cls.__new__(cls)
+        self.parsed = parsed
+        return self
+
     def replace(self, hash_mode: bool = False, **fields: str) -> "URL":
         if hash_mode:
             if any([k in fields for k in ["scheme", "netloc", "hostname", "port", "uri", "fragment"]]):
@@ -61,9 +74,14 @@ class URL:
             fields.pop("uri", None)
             fields.update(scheme=parsed.scheme, netloc=parsed.netloc, path=parsed.path)
 
+        if "path" not in fields:
+            # path 没有变化，不需要重新规范化
+            return URL._from_normalized(self.parsed._replace(**fields))
         return URL(self.parsed._replace(**fields))
 
-    def replace_query(self, hash_mode: bool = False, **fields: str) -> "URL":
+    def replace_query(
+        self, updates: Optional[Mapping[str, Optional[str]]] = None, *, hash_mode: bool = False, **fields: Optional[str]
+    ) -> "URL":
         """
         更新 QueryString 中的参数。
 
@@ -72,29 +90,38 @@ class URL:
         * 若某个参数值为 None，则删除该参数
         * 若某个参数在 QueryString 中出现多次，只更新第一处（删除时也只删除第一处）
 
+        updates: 需要更新的参数字典，已有现成字典时直接传入，省去 ** 展开再打包；与 fields 同时给出时 fields 优先
         hash_mode: 许多 SPA 使用 hash 模式，hash 模式下，所有路径、参数都在 # 后面
         """
+        updates = updates or {}
+        if fields:
+            updates = {**updates, **fields}
+
         if hash_mode:
             return self.replace(
                 fragment=URL(self.parsed.fragment)
                 # 注：mypy 抽风
-                .replace_query(**fields).url,  # type: ignore[arg-type]
+                .replace_query(updates).url,  # type: ignore[arg-type]
             )
 
-        pairs = [[f, v] for (f, v) in parse_qsl(self.parsed.query)]
-
-        for field, value in fields.items():
-            found: bool = False
-            for pair in pairs:
-                if pair[0] == field:
-                    pair[1] = value
-                    # 找到第一处之后就不需要继续处理后面的了
-                    found = True
-                    break
-            if not found:
-                pairs.append([field, value])
-
-        return URL(self.parsed._replace(query=urlencode([(f, v) for (f, v) in pairs if v is not None])))
+        # 用一次正则扫描取出所有参数，代替 parse_qsl 的逐段拆分
+        pairs: List[Tuple[str, Optional[str]]] = [
+            (unquote_plus(f), unquote_plus(v)) for (f, v) in _QUERY_PAIR_RE.findall(self.parsed.query)
+        ]
+        # 参数名 -> 第一次出现的位置，保留重复参数的同时，查找第一处时不需要遍历 pairs
+        first_index: Dict[str, int] = {}
+        for i, (f, _) in enumerate(pairs):
+            first_index.setdefault(f, i)
+
+        for field, value in updates.items():
+            index = first_index.get(field)
+            if index is None:
+                first_index[field] = len(pairs)
+                pairs.append((field, value))
+            else:
+                pairs[index] = (field, value)
+
+        return URL._from_normalized(self.parsed._replace(query=urlencode([(f, v) for (f, v) in pairs if v is not None])))
 
     @property
     def url(self) -> str:
@@ -4,7 +4,21 @@ import re
 from email_validator import EmailNotValidError, validate_email
 
 
+_SIMPLE_EMAIL_PATTERN = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\Z")
+
+
 def is_valid_email(email: str) -> bool:
+    """
+    使用正则快速检查常见格式的邮箱地址，返回 True/False。
+    不支持国际化（非 ascii）邮箱等少见格式，需要完整按 RFC 校验时使用 is_valid_email_strict。
+    """
+    return isinstance(email, str) and _SIMPLE_EMAIL_PATTERN.match(email) is not None
+
+
+def is_valid_email_strict(email: str) -> bool:
+    """
+    使用 email_validator 完整校验邮箱地址（不检查域名是否可投递），返回 True/False
+    """
     try:
         validate_email(email, check_deliverability=False)
         return True
@@ -96,14 +110,12 @@ def is_valid_phone(phone: str, allow_fake: bool = False) -> bool:
     """
     检查是否合法的中国内地手机号，返回 True/False
     """
-    try:
-        valid = bool(_PHONE_PATTERN_CHINA.match(phone))
-        if not valid and allow_fake:
-            return is_fake_phone(phone)
-        return valid
-    except TypeError:
-        # 当 phone 不是字符串时，会抛出 TypeError
+    # 先用类型和长度排除不合法的输入，不再依赖正则匹配非字符串时抛出的 TypeError
+    if not isinstance(phone, str) or len(phone) != 11:
         return False
+    if _PHONE_PATTERN_CHINA.match(phone) is not None:
+        return True
+    return allow_fake and is_fake_phone(phone)
 
 
 _FAKE_PHONE_PATTERN = re.compile(r"^100[0-9]{8}$")
@@ -113,10 +125,9 @@ def is_fake_phone(phone: str) -> bool:
     """
     在我们的体系中，我们使用 100 开头的号码作为假手机号。
     """
-    try:
-        return bool(_FAKE_PHONE_PATTERN.match(phone))
-    except TypeError:
+    if not isinstance(phone, str) or len(phone) != 11:
         return False
+    return _FAKE_PHONE_PATTERN.match(phone) is not None
 
 
 def is_valid_ric(number: str) -> bool:
@@ -138,10 +149,11 @@ def is_valid_ric(number: str) -> bool:
     # 第一代身份证没有尾数校验
     # 计算校验位：身份证最后一位数字要与前17位经过运算后的数字相等，否则返回False
     if len(number) == 18:
-        try:
-            checksum = (1 - 2 * int(number[:-1], 13)) % 11
-        except ValueError:
+        # int(..., 13) 会把 a/b/c 当作数字解析，先要求前 17 位全部为 ascii 数字
+        body = number[:-1]
+        if not (body.isascii() and body.isdigit()):
             return False
+        checksum = (1 - 2 * int(body, 13)) % 11
         # 要求如果最后一位是字母 X，则必须是大写
         last_digit = "X" if checksum == 10 else str(checksum)
         if number[-1] != last_digit:
@@ -154,29 +166,27 @@ def is_valid_ric_birthday(number: str) -> bool:
     """
     出生日期的校验篇幅较长，这边单拎出来写，只能在is_valid_ric（）中调用此函数
     """
-    # 获取年份
+    # 先统一为 yyyymmdd 的形式
     # 第一代身份证出生年份用两位表示，且如果这两位数<=13，则在前面填充‘20’，因为1913年及出生以前的人（到现在107岁），应当不在实际场景中
     if len(number) == 15:
-        try:
-            if int(number[6:8]) <= 13:
-                year = "20" + number[6:8]
-            else:
-                year = "19" + number[6:8]
-        except TypeError:
+        birthday = number[6:12]
+        if not (birthday.isascii() and birthday.isdigit()):
             return False
+        birthday = ("20" if birthday[:2] <= "13" else "19") + birthday
     else:
-        year = number[6:10]
-
-    # 获取月份
-    month = number[8:10] if len(number) == 15 else number[10:12]
+        birthday = number[6:14]
+        if not (birthday.isascii() and birthday.isdigit()):
+            return False
 
-    # 获取日期
-    day = number[10:12] if len(number) == 15 else number[12:14]
+    year, month, day = int(birthday[:4]), int(birthday[4:6]), int(birthday[6:])
 
-    # 校验生日，非法日期返回False
-    try:
-        datetime.date(int(year), int(month), int(day))
-    except ValueError:
+    # 大部分情况用整数比较即可判断，只有 29 日及以后需要由 datetime.date 判断当月天数（含闰年）
+    if year < datetime.MINYEAR or not 1 <= month <= 12 or not 1 <= day <= 31:
         return False
+    if day >= 29:
+        try:
+            datetime.date(year, month, day)
+        except ValueError:
+            return False
 
     return True
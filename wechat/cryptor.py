@@ -13,6 +13,9 @@ from .ierror import *
 
 logger = logging.Logger(__name__)
 
+# get_random_str 使用的字符集, 只需要拼接一次
+_RANDOM_STR_RULE = string.ascii_letters + string.digits
+
 """
 关于Crypto.Cipher模块，ImportError: No module named 'Crypto'解决方案
 请到官方网站 https://www.dlitz.net/software/pycrypto/ 下载pycrypto。
@@ -190,8 +193,7 @@ class Prpcrypt(object):
         """ 随机生成16位字符串
         @return: 16位字符串
         """
-        rule = string.ascii_letters + string.digits
-        str = random.sample(rule, 16)
+        str = random.sample(_RANDOM_STR_RULE, 16)
         return "".join(str)
 
 
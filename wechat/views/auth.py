@@ -1,8 +1,8 @@
 '''
 TODO: 实现微信认证
 
-def is_hash_mode_url(url: str):
-    return re.compile(r"/#/").findall(url) != []
+def is_hash_mode_url(url: str) -> bool:
+    return "/#/" in url
 
 
 class WebAuthParams(BaseModel):
@@ -53,14 +53,8 @@ def webauth(
         # 此时这里可能是普通的后端应用或者网页应用
         # 也可能是SPA的hash mode应用，所以要做区别对url进行处理
         url = URL(params.redirect_uri)
-        hash_mode = False
-        if is_hash_mode_url(url.url):
-            hash_mode = True
-        url = url.replace_query(
-            code=params.code,
-            state=params.state if params.state is not None else "",
-            hash_mode=hash_mode,
-        )
+        updates = {"code": params.code, "state": params.state or ""}
+        url = url.replace_query(updates, hash_mode=is_hash_mode_url(url.url))
 
     # 返回url供上游自行处理
     return text.Plain(status_code=200, content=str(url))